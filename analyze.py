@@ -24,28 +24,26 @@ __status__ = 'Development'
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import os
-import pandas as pd
-from keplergl import KeplerGl
 from collections import defaultdict, OrderedDict
 from aviation_map import AviationMap
 from aviation_network import AviationNetwork
+from network_data import NetworkData
 
 # ## Import data
 
-vertices_df = pd.read_csv('./processed_data/vertices.csv', header=0)
-print(vertices_df.shape)
-vertices_df = vertices_df[
-    (vertices_df.in_charge) &
-    (vertices_df.name.str.contains('Air Force Base') == False) &
-    (vertices_df.init_capacity != 0)]
-print(vertices_df.shape)
+network_data = NetworkData.load('./processed_data/network')
+vertices = network_data.vertices
+print(len(vertices['iata']))
+network_data = network_data.select(
+    vertices['in_charge'] &
+    ~vertices['air_force_base'] &
+    (vertices['init_capacity'] != 0))
+print(len(network_data.vertices['iata']), len(network_data.edges['origin']))
+
+vertices_df = network_data.vertices_df()
 vertices_df.tail(5)
 
-edges_df = pd.read_csv('./processed_data/edges.csv', header=0)
-print(edges_df.shape)
-unique_airport_list = vertices_df.iata.unique()
-edges_df = edges_df[(edges_df.origin.isin(unique_airport_list)) & (edges_df.dest.isin(unique_airport_list))]
-print(edges_df.shape)
+edges_df = network_data.edges_df()
 edges_df.tail(5)
 
 # ## Export a map
@@ -55,5 +53,7 @@ aviation_map.create_map(filename='./visualization/ns_flight_map')
 
 # ## Solve the maximum flow problem
 
-aviation_network = AviationNetwork(vertices_df)
+aviation_network = AviationNetwork(vertices_df, edges_df)
 results = aviation_network.compute_min_max_flow(max_attacks=15, max_attack_per_airport=1)
+
+results[results.sequence.notna()].sort_values('sequence')
@@ -0,0 +1,137 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+STATE_COLUMNS = ['capacity', 'number_of_attacks', 'sequence', 'flow_value']
+
+
+def network_digest(network):
+    '''
+    Hash the arcs and capacities of the given network, so a checkpoint can
+    tell whether it is resumed on the network it was written for.
+    '''
+    digest = hashlib.sha256()
+    for array in (network.tail, network.head, network.capacity):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+class AttackState:
+    '''
+    State of every attack target (airport or route) during an attack run,
+    held in arrays aligned with the rows of the given target table.
+
+    The table is indexed by target name and has at least the arcs,
+    shares, init_capacity and security_level columns: the arcs of a target
+    get its capacity times their shares.
+
+    The given settings, such as the network digest and the options that
+    change which attacks are selected, are written to checkpoints and
+    must match when one is restored.
+    '''
+    def __init__(self, table, capacity, settings=None):
+        self.table = table
+        self.settings = json.dumps(settings or dict(), sort_keys=True)
+        self.names = table.index.to_numpy()
+        self.arcs = table.arcs.to_numpy()
+        self.shares = table.shares.to_numpy()
+        self.security_level = table.security_level.to_numpy(dtype=np.float64)
+        self.capacity = np.asarray(capacity, dtype=np.float64).copy()
+        self.number_of_attacks = np.zeros(len(table), dtype=np.int64)
+        self.sequence = np.zeros(len(table), dtype=np.int64)
+        self.flow_value = np.full(len(table), np.nan)
+
+    def attackable(self, max_attack_per_target):
+        '''
+        Get the indices of the targets that can still be attacked.
+        '''
+        return np.flatnonzero(self.number_of_attacks < max_attack_per_target)
+
+    def record(self, idx, seq, flow_value, new_capacity):
+        '''
+        Record the attack on the target at the given index.
+        '''
+        self.capacity[idx] = new_capacity
+        self.number_of_attacks[idx] += 1
+        self.sequence[idx] = seq
+        self.flow_value[idx] = flow_value
+
+    def to_frame(self):
+        '''
+        Get the target table with the state columns. Targets never attacked
+        have a missing sequence and flow value.
+        '''
+        sequence = pd.array(self.sequence, dtype='Int64')
+        sequence[self.sequence == 0] = pd.NA
+        return self.table.drop(columns=['arcs', 'shares']).assign(
+            capacity=self.capacity,
+            number_of_attacks=self.number_of_attacks,
+            sequence=sequence,
+            flow_value=self.flow_value)
+
+    def save(self, path, network, seq, flow_value, percent_diff, cached_reductions=None):
+        '''
+        Write a compressed binary checkpoint of the state after the given
+        round, with the capacities and maximum flow of the given network.
+        The file is replaced atomically, so a crash while writing leaves the
+        previous checkpoint intact.
+        '''
+        if cached_reductions is None:
+            cached_reductions = dict()
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                names=self.names.astype(str),
+                settings=self.settings,
+                capacity=self.capacity,
+                number_of_attacks=self.number_of_attacks,
+                sequence=self.sequence,
+                flow_value=self.flow_value,
+                network_capacity=network.capacity,
+                network_flow=network.flow,
+                round=seq,
+                total_flow_value=flow_value,
+                percent_diff=percent_diff,
+                cached_names=np.array(list(cached_reductions), dtype=str),
+                cached_reductions=np.array(list(cached_reductions.values()), dtype=np.float64))
+        os.replace(temp_path, path)
+
+    def restore(self, path, network):
+        '''
+        Load a checkpoint written by save into this state and the given
+        network. Return the last completed round, the maximum flow value and
+        percentage difference after it, and the cached flow reductions.
+        Raise ValueError if the checkpoint was written for other targets,
+        another network or other settings.
+        '''
+        with np.load(path) as checkpoint:
+            if not np.array_equal(checkpoint['names'], self.names.astype(str)) or \
+                    len(checkpoint['network_capacity']) != len(network.capacity):
+                raise ValueError(f'Checkpoint {path} was written for a different network.')
+            settings = str(checkpoint['settings']) if 'settings' in checkpoint.files else '{}'
+            if settings != self.settings:
+                raise ValueError(f'Checkpoint {path} was written with settings {settings}, '
+                                 f'not {self.settings}.')
+            self.capacity[:] = checkpoint['capacity']
+            self.number_of_attacks[:] = checkpoint['number_of_attacks']
+            self.sequence[:] = checkpoint['sequence']
+            self.flow_value[:] = checkpoint['flow_value']
+            network.capacity[:] = checkpoint['network_capacity']
+            network.flow[:] = checkpoint['network_flow']
+            cached_reductions = dict(zip(checkpoint['cached_names'].tolist(),
+                                         checkpoint['cached_reductions'].tolist()))
+            return (int(checkpoint['round']), float(checkpoint['total_flow_value']),
+                    float(checkpoint['percent_diff']), cached_reductions)
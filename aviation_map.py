@@ -25,112 +25,115 @@ __status__ = 'Development'
 # %%
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import pandas as pd
-from keplergl import KeplerGl
-
+from functools import cached_property
 
 # %%
 class AviationMap:
+    airport_cols = ['name', 'country', 'region', 'latitude', 'longitude',
+                    'facility_type', 'init_capacity', 'security_level']
+
     def __init__(self, airport_df, flight_df):
         self.airport_df = airport_df
         self.flight_df = flight_df
-        self.airport_dict = None
-        self.airport_list = None
-        self.flight_list = None
+        self.airport_frames = None
+        self.flight_frame = None
         
-        self._create_airport_dict()
-        self._create_airport_list()
-        self._create_flight_list()
-    
-    def _create_airport_dict(self):
-        airport_dict = dict()
-        for airport in self.airport_df.itertuples():
-            airport_dict[airport.iata] = {
-                'name': airport.name,
-                'country': airport.country,
-                'region': airport.region,
-                'latitude': airport.latitude,
-                'longitude': airport.longitude,
-                'facility_type': airport.facility_type,
-                'init_capacity': airport.init_capacity,
-                'security_level': airport.security_level
-            }
-        self.airport_dict = airport_dict
-    
-    def _create_airport_list(self):
-        airport_list = list()
-        for airport in self.airport_df.itertuples():
-            airport_list.append({
-                'type': 'Feature',
-                'geometry': {
-                    'type': 'Point', 'coordinates': [airport.longitude, airport.latitude]
-                },
-                'properties': {
-                    'name': airport.name,
-                    'country': airport.country,
-                    'region': airport.region,
-                    'latitude': airport.latitude,
-                    'longitude': airport.longitude,
-                    'facility_type': airport.facility_type,
-                    'init_capacity': airport.init_capacity,
-                    'security_level': airport.security_level
-                }
-            })
-        self.airport_list = airport_list
+        self._create_airport_frames()
+        self._create_flight_frame()
+
+    @classmethod
+    def from_network_data(cls, data):
+        '''
+        Create a map from a columnar NetworkData artifact.
+        '''
+        return cls(data.vertices_df(), data.edges_df())
     
-    def _create_flight_list(self):
-        flight_list = list()
-        for flight in self.flight_df.itertuples():
-            origin = flight.origin
-            dest = flight.dest
-            flight_list.append({
-                'type': 'Feature',
-                'geometry': {
-                    'type': 'LineString', 'coordinates': [
-                        (self.airport_dict[origin]['longitude'], self.airport_dict[origin]['latitude']),
-                        (self.airport_dict[dest]['longitude'], self.airport_dict[dest]['latitude'])
-                    ]
-                },
-                'properties': {
-                    'origin_country': self.airport_dict[origin]['country'],
-                    'origin_airport': self.airport_dict[origin]['name'],
-                    'origin_longitude': self.airport_dict[origin]['longitude'],
-                    'origin_latitude': self.airport_dict[origin]['latitude'],
-                    'dest_country': self.airport_dict[dest]['country'],
-                    'dest_airport': self.airport_dict[dest]['name'],
-                    'dest_longitude': self.airport_dict[dest]['longitude'],
-                    'dest_latitude': self.airport_dict[dest]['latitude']
-                }
-            })
-        self.flight_list = flight_list
+    def _create_airport_frames(self):
+        '''
+        Split the airports by facility type in a single pass.
+        '''
+        self.airport_frames = dict(tuple(self.airport_df[self.airport_cols].groupby('facility_type')))
     
-    def create_map(self, filename='airport_map'):
-        flight_map = KeplerGl(height=500, width=800)
+    def _create_flight_frame(self):
+        '''
+        Attach origin and destination airport info to every route with one
+        join per endpoint on the IATA-indexed airport table.
+        '''
+        airports = self.airport_df.set_index('iata')[['country', 'name', 'longitude', 'latitude']]
+        airports.columns = ['country', 'airport', 'longitude', 'latitude']
+        flight_frame = self.flight_df[['origin', 'dest', 'num_of_flights']] \
+            .join(airports.add_prefix('origin_'), on='origin', how='inner') \
+            .join(airports.add_prefix('dest_'), on='dest', how='inner')
+        self.flight_frame = flight_frame.reset_index(drop=True)
+
+    @cached_property
+    def airport_dict(self):
+        '''
+        Map every IATA code to the info of its airport, built on first use.
+        '''
+        airports = self.airport_df.drop_duplicates('iata', keep='last').set_index('iata')
+        return airports[self.airport_cols].to_dict('index')
 
-        flight_feature_collection = {
-            'type': 'FeatureCollection',
-            'features': self.flight_list
-        }
+    @cached_property
+    def airport_list(self):
+        '''
+        List every airport as a GeoJSON point feature.
+        '''
+        return [{
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Point', 'coordinates': [airport['longitude'], airport['latitude']]
+            },
+            'properties': airport
+        } for airport in self.airport_df[self.airport_cols].to_dict('records')]
 
-        large_airport_feature_collection = {
-            'type': 'FeatureCollection',
-            'features': [airport for airport in self.airport_list if airport['properties']['facility_type'] == 'large_airport']
-        }
+    @cached_property
+    def flight_list(self):
+        '''
+        List every route as a GeoJSON line feature.
+        '''
+        flight_cols = ['origin_country', 'origin_airport', 'origin_longitude', 'origin_latitude',
+                       'dest_country', 'dest_airport', 'dest_longitude', 'dest_latitude']
+        return [{
+            'type': 'Feature',
+            'geometry': {
+                'type': 'LineString', 'coordinates': [
+                    (flight['origin_longitude'], flight['origin_latitude']),
+                    (flight['dest_longitude'], flight['dest_latitude'])
+                ]
+            },
+            'properties': flight
+        } for flight in self.flight_frame[flight_cols].to_dict('records')]
 
-        medium_airport_feature_collection = {
-            'type': 'FeatureCollection',
-            'features': [airport for airport in self.airport_list if airport['properties']['facility_type'] == 'medium_airport']
-        }
+    def _reduce_precision(self, df, precision):
+        '''
+        Round every coordinate column to the given number of decimals.
+        '''
+        coordinate_cols = [col for col in df.columns if col.endswith(('latitude', 'longitude'))]
+        return df.assign(**{col: df[col].round(precision) for col in coordinate_cols})
+    
+    def create_map(self, filename='airport_map', precision=None, min_flights=None):
+        '''
+        Save the routes and airports as a Kepler map. Coordinates can be
+        rounded to the given number of decimals and routes with fewer than
+        min_flights flights left out to cap the size of the HTML file.
+        '''
+        from keplergl import KeplerGl
+        flight_map = KeplerGl(height=500, width=800)
 
-        small_airport_feature_collection = {
-            'type': 'FeatureCollection',
-            'features': [airport for airport in self.airport_list if airport['properties']['facility_type'] == 'small_airport']
-        }
+        flight_frame = self.flight_frame
+        if min_flights is not None:
+            flight_frame = flight_frame[flight_frame.num_of_flights >= min_flights]
+        airport_frames = self.airport_frames
+        if precision is not None:
+            flight_frame = self._reduce_precision(flight_frame, precision)
+            airport_frames = {facility_type: self._reduce_precision(df, precision)
+                              for (facility_type, df) in airport_frames.items()}
 
-        flight_map.add_data(data=flight_feature_collection, name='flights')
-        flight_map.add_data(data=large_airport_feature_collection, name='large_airports')
-        flight_map.add_data(data=medium_airport_feature_collection, name='medium_airports')
-        flight_map.add_data(data=small_airport_feature_collection, name='small_airports')
+        flight_map.add_data(data=flight_frame, name='flights')
+        for facility_type in ['large_airport', 'medium_airport', 'small_airport']:
+            if facility_type in airport_frames:
+                flight_map.add_data(data=airport_frames[facility_type], name=f'{facility_type}s')
 
         flight_map.save_to_html(file_name=f'{filename}.html')
         return flight_map
@@ -23,89 +23,132 @@ __status__ = 'Development'
 
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import math
-import pprint
+import os
 import numpy as np
 import pandas as pd
-import networkx as nx
-from keplergl import KeplerGl
-from num2words import num2words
+from flow_network import EPSILON, FlowNetwork
+from max_flow import (ComponentMaxFlow, evaluate_candidates, evaluate_parallel, evaluate_sets_parallel,
+                      evaluation_pool)
+from instrumentation import RoundTimer, emit
+from attack_state import AttackState, network_digest
+from spatial_index import SpatialIndex
+
+
+def _flatten_candidates(candidates):
+    '''
+    Concatenate the arcs and new capacities of the given candidate attacks,
+    with the index of the candidate of every arc.
+    '''
+    if not candidates:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64))
+    sizes = [len(arcs) for (_, arcs, _) in candidates]
+    return (np.concatenate([arcs for (_, arcs, _) in candidates]),
+            np.concatenate([new_capacities for (_, _, new_capacities) in candidates]),
+            np.repeat(np.arange(len(candidates)), sizes))
+
+
+def attack_impact(curr_capacity, security_level, num_attacks):
+    '''
+    Compute impact to airports based on the given current capacities,
+    security levels, and numbers of attacks, as scalars or arrays.
+    '''
+    K = 5.0 - np.asarray(security_level) / 10.0
+    with np.errstate(invalid='ignore'):
+        weight = 0.8 * (-(np.asarray(num_attacks) - 3) / 3.0) ** K + 0.2
+    return np.where(np.asarray(num_attacks) == 3, 0.0, curr_capacity * weight)
+
+
+def attacked_capacities(init_capacity, security_level, scenarios):
+    '''
+    Get the capacity of every airport after the number of attacks given
+    for it in each row of the scenario matrix.
+    '''
+    capacities = np.tile(init_capacity, (len(scenarios), 1))
+    # The third attack takes an airport down, so further ones change nothing.
+    for num_attacks in range(1, min(scenarios.max(initial=0), 3) + 1):
+        attacked = scenarios >= num_attacks
+        impact = attack_impact(capacities, security_level, num_attacks)
+        capacities = np.where(attacked, impact, capacities)
+    return capacities
 
 
 # +
 class AviationNetwork:
-    def __init__(self, airport_df):
+    def __init__(self, airport_df, route_df=None):
         self.airport_df = airport_df
+        self.route_df = route_df
         self.airport_dict = None
         self.airport_list = None
         self.flight_list = None
         
-        self.DG = nx.DiGraph()
-        self.pp = pprint.PrettyPrinter(indent=2, compact=True)
+        self.network = None
+        self.spatial_index = None
         
         self._create_airport_dict()
+
+    @property
+    def pp(self):
+        '''
+        Pretty printer for inspecting results, created on use.
+        '''
+        import pprint
+        return pprint.PrettyPrinter(indent=2, compact=True)
+
+    @classmethod
+    def from_network_data(cls, data):
+        '''
+        Create a network from a columnar NetworkData artifact.
+        '''
+        return cls(data.vertices_df(), data.edges_df())
         
     def _create_airport_dict(self):
         '''
-        Map nodes and edges to a directed graph.
+        Map nodes and edges to an array-backed flow network.
         '''
-        for airport in self.airport_df.itertuples():
-            node_in = airport.iata + '_in'
-            node_out = airport.iata + '_out'
-            self.DG.add_edge('Source', node_in, capacity=float('inf'))
-            self.DG.add_edge(node_in, node_out, capacity=airport.init_capacity)
-            self.DG.add_edge(node_out, 'Target', capacity=float('inf'))
+        self.network = FlowNetwork.from_airports(self.airport_df, self.route_df)
     
-    def _get_airport_info(self):
-        '''
-        Get all the airports info from the given airport_df
-        '''
-        airport_info = dict()
-        for airport in self.airport_df.itertuples():
-            airport_info[airport.iata] = {
-                'name': airport.name,
-                'country': airport.country,
-                'region': airport.region,
-                'latitude': airport.latitude,
-                'longitude': airport.longitude,
-                'facility_type': airport.facility_type,
-                'init_capacity': airport.init_capacity,
-                'security_level': airport.security_level,
-                'node_in': airport.iata + '_in',
-                'node_out': airport.iata + '_out',
-                'number_of_attacks': 0,
-                'sequence': None,
-                'flow_value': None
-        }
-        return airport_info
-        
-    def _compute_attack_impact(self, curr_capacity, security_level, num_attacks):
+    def _get_airport_table(self):
         '''
-        Compute impact to an airport based on the given current capacity,
-        security level, and number of attacks.
+        Get all the airports info from the given airport_df, indexed by IATA
+        code, with the arcs of every airport and their shares of its
+        capacity.
         '''
-        if num_attacks == 3:
-            return 0
-        K = 5.0 - security_level / 10.0
-        weight = 0.8 * (-(num_attacks - 3) / 3.0) ** K + 0.2
-        return curr_capacity * weight
-    
-    def _filter_airports(self, v, max_attack_per_airport):
+        airport_cols = ['name', 'country', 'region', 'latitude', 'longitude',
+                        'facility_type', 'init_capacity', 'security_level']
+        return self.airport_df.set_index('iata')[airport_cols].assign(
+            arcs=list(self.network.airport_arcs),
+            shares=list(self.network.airport_shares))
+
+    def _get_route_table(self):
         '''
+        Get all the routes info of the network, indexed by 'ORIGIN-DEST'. A
+        route is as secure as the less secure of its two airports.
         '''
-        return v['number_of_attacks'] < max_attack_per_airport
-    
-    def _get_attackable_airports(self, d, max_attack_per_airport):
+        security_level = self.airport_df.set_index('iata').security_level
+        origin = np.array([origin for (origin, _) in self.network.routes], dtype=object)
+        dest = np.array([dest for (_, dest) in self.network.routes], dtype=object)
+        return pd.DataFrame({
+            'origin': origin,
+            'dest': dest,
+            'init_capacity': self.network.capacity[self.network.route_arcs],
+            'security_level': np.minimum(security_level[origin].to_numpy(),
+                                         security_level[dest].to_numpy()),
+            'arcs': list(self.network.route_arcs[:, None]),
+            'shares': list(np.ones((len(origin), 1)))
+        }, index=pd.Index(origin + '-' + dest, name='iata'))
+        
+    def _compute_attack_impact(self, curr_capacity, security_level, num_attacks):
         '''
-        Get a list of attackable airports based on the given maximum number of
-        attacks to each airport.
+        Compute impact to airports based on the given current capacities,
+        security levels, and numbers of attacks.
         '''
-        return dict((k, v) for (k, v) in d.items() if self._filter_airports(v, max_attack_per_airport))
+        return attack_impact(curr_capacity, security_level, num_attacks)
         
     def print_result(self, seq, airport_iata, airport_info, new_capacity):
         '''
         Print out basic results after an attack.
         '''
+        from num2words import num2words
         seq = num2words(seq, to='ordinal_num')
         airport_name = airport_info['name']
         num_attacks = airport_info['number_of_attacks']
@@ -118,15 +161,12 @@ class AviationNetwork:
         print(f'Total number of attacks to this airport: {num_attacks}')
         print('--------------------------------------------------')
     
-    def _compute_max_flow(self, DG):
+    def _compute_max_flow(self, network):
         '''
-        Compute a total maximum flow of the given directed graph.
+        Compute a total maximum flow of the given flow network, whose flow is
+        kept maximum by the attack loop.
         '''
-        total_max_flow = 0
-        for (_, _, c) in DG.edges.data('capacity'):
-            if not math.isinf(c):
-                total_max_flow += c
-        return total_max_flow
+        return network.flow_value()
     
     def _compute_percentage_diff(self, prev, curr):
         '''
@@ -144,73 +184,367 @@ class AviationNetwork:
         '''
         Print out a current maximum flow of the given directed graph.
         '''
+        from num2words import num2words
         seq = num2words(seq, to='ordinal_num')
         print(f'{seq} & {airport_iata} & {total_max_flow:,.0f} & {curr_percent_diff:.2f}\% & {pts_diff:.2f}pts \\\ ')
     
-    def compute_min_max_flow(self, max_attacks=15, max_attack_per_airport=1):
+    def _select_lazy(self, max_flow, candidates, cached_reductions=None, known_flow_values=None):
+        '''
+        Select the candidate attack with the smallest resulting maximum flow
+        while evaluating as few candidates as possible.
+
+        Lowering arcs to new capacities can cut the flow by at most their
+        flow above the new capacities, so candidates are evaluated in
+        decreasing order of that bound until the best flow found beats the
+        bound of the next one. This selects the same attack as
+        evaluating every candidate. With cached_reductions, the flow
+        reductions last measured for each candidate are taken as tighter
+        bounds, CELF-style, which saves more solves but can miss the best
+        attack when reductions grow between rounds. Candidates whose flow
+        value is already in known_flow_values (NaN if not) need no solve.
+
+        Return the index of the selected candidate, its flow value, the
+        number of solves and an upper bound on how much lower the flow of a
+        skipped candidate could be.
+        '''
+        network = max_flow.network
+        total_flow = max_flow.flow_value
+        (arcs, new_caps, groups) = _flatten_candidates(candidates)
+        bounds = np.bincount(groups, np.maximum(0, network.flow[arcs] - new_caps),
+                             minlength=len(candidates))
+        if known_flow_values is not None:
+            known = ~np.isnan(known_flow_values)
+            bounds[known] = total_flow - known_flow_values[known]
+        priorities = bounds.copy()
+        if cached_reductions is not None:
+            cached = np.array([cached_reductions.get(name, np.inf) for (name, _, _) in candidates])
+            priorities = np.minimum(priorities, cached)
+        order = np.lexsort((np.arange(len(candidates)), -priorities))
+        tolerance = EPSILON * max(1.0, abs(total_flow))
+
+        (best, best_flow_value) = (None, None)
+        (num_solves, num_visited) = (0, len(order))
+        for (rank, i) in enumerate(order):
+            lower = total_flow - priorities[i]
+            if best is not None and (lower > best_flow_value + tolerance or
+                                     (lower >= best_flow_value - tolerance and i > best)):
+                num_visited = rank
+                break
+            if known_flow_values is not None and known[i]:
+                flow_value = known_flow_values[i]
+            else:
+                flow_value = max_flow.evaluate_capacities(candidates[i][1], candidates[i][2])
+                num_solves += 1
+            if cached_reductions is not None:
+                cached_reductions[candidates[i][0]] = total_flow - flow_value
+            if best is None or flow_value < best_flow_value or (flow_value == best_flow_value and i < best):
+                (best, best_flow_value) = (i, flow_value)
+
+        skipped = order[num_visited:]
+        gap_bound = 0.0
+        if skipped.size:
+            gap_bound = max(0.0, bounds[skipped].max() - (total_flow - best_flow_value))
+        return (best, best_flow_value, num_solves, gap_bound)
+
+    def evaluate_scenarios(self, scenarios, workers=None):
+        '''
+        Compute the maximum flow after each of the given attack scenarios,
+        independently of each other and of compute_min_max_flow.
+
+        The scenarios are a matrix with one row per scenario and one column
+        per airport of airport_df, holding the number of attacks to that
+        airport, or a DataFrame whose columns are IATA codes, where missing
+        airports are not attacked. Return an array of maximum flow values.
+
+        The network is solved once and every scenario only repairs that
+        flow in the connected components its attacks touch. Duplicate
+        scenarios are evaluated once, and scenarios whose attacks all cross
+        one minimum cut are settled without a solve. With workers, the
+        remaining scenarios are evaluated across that many processes.
+        '''
+        if isinstance(scenarios, pd.DataFrame):
+            unknown = scenarios.columns.difference(self.airport_df.iata)
+            if len(unknown):
+                raise ValueError(f'Unknown airports: {", ".join(map(str, unknown))}')
+            scenarios = scenarios.reindex(columns=self.airport_df.iata, fill_value=0)
+        scenarios = np.asarray(scenarios, dtype=np.int64)
+        if scenarios.ndim != 2 or scenarios.shape[1] != len(self.airport_df):
+            raise ValueError(f'Scenarios must have one column per airport ({len(self.airport_df)}).')
+        if (scenarios < 0).any():
+            raise ValueError('Numbers of attacks cannot be negative.')
+
+        (scenarios, inverse) = np.unique(np.minimum(scenarios, 3), axis=0, return_inverse=True)
+        arcs = self.network.airport_arcs.ravel()
+        capacities = self.network.airport_arc_capacities(attacked_capacities(
+            self.network.airport_capacity,
+            self.airport_df.security_level.to_numpy(dtype=np.float64),
+            scenarios)).reshape(len(scenarios), len(arcs))
+        max_flow = ComponentMaxFlow(self.network.copy())
+
+        if workers is not None and workers > 1 and len(scenarios) > 1:
+            with evaluation_pool(max_flow.network, workers) as executor:
+                flow_values = evaluate_sets_parallel(executor, workers, max_flow, arcs, capacities)
+        else:
+            flow_values = max_flow.evaluate_capacity_sets(arcs, capacities)
+        return flow_values[inverse.ravel()]
+
+    def get_spatial_index(self):
+        '''
+        Get a spatial index over the airports, built on first use.
+        '''
+        if self.spatial_index is None:
+            self.spatial_index = SpatialIndex.from_frame(self.airport_df)
+        return self.spatial_index
+
+    def regional_scenarios(self, epicenters, radius_km, num_attacks=1, falloff=False):
+        '''
+        Get a scenario matrix for evaluate_scenarios with a row per given
+        epicenter IATA code, attacking every airport within the given radius
+        of it num_attacks times. With falloff, airports further out are hit
+        fewer times, down to once at the edge of the radius.
+        '''
+        index = self.get_spatial_index()
+        airport_ids = pd.Series(np.arange(len(self.airport_df)), index=self.airport_df.iata)
+        unknown = pd.Index(epicenters).difference(airport_ids.index)
+        if len(unknown):
+            raise ValueError(f'Unknown airports: {", ".join(map(str, unknown))}')
+        centers = airport_ids[list(epicenters)].to_numpy()
+        (indices, distances) = index.query_radius(index.latitude[centers], index.longitude[centers],
+                                                  radius_km, return_distance=True)
+        scenarios = np.zeros((len(centers), len(self.airport_df)), dtype=np.int64)
+        for (row, airports, distance) in zip(scenarios, indices, distances):
+            if falloff:
+                row[airports] = np.maximum(1, np.ceil(num_attacks * (1 - distance / radius_km)))
+            else:
+                row[airports] = num_attacks
+        return scenarios
+
+    def evaluate_regional_attacks(self, epicenters, radius_km, num_attacks=1, falloff=False,
+                                  workers=None):
+        '''
+        Attack every airport within the given radius of each given epicenter
+        at once, as with a regional disruption, each epicenter on its own.
+        Return a DataFrame indexed by epicenter with the number of airports
+        hit, the resulting maximum flow and the flow lost.
+        '''
+        scenarios = self.regional_scenarios(epicenters, radius_km, num_attacks, falloff)
+        # An unattacked first row gives the flow every epicenter is compared to.
+        flow_values = self.evaluate_scenarios(np.vstack([np.zeros_like(scenarios[:1]), scenarios]),
+                                              workers=workers)
+        (total_flow, flow_values) = (flow_values[0], flow_values[1:])
+        return pd.DataFrame({
+            'num_airports': (scenarios > 0).sum(axis=1),
+            'flow_value': flow_values,
+            'lost_flow': total_flow - flow_values,
+            'percent_lost': (total_flow - flow_values) / total_flow * 100
+        }, index=pd.Index(list(epicenters), name='iata'))
+
+    def compute_min_max_flow(self, max_attacks=15, max_attack_per_airport=1, **kwargs):
         '''
         Compute minimum maximum flow for every attack until the given maximum
-        number of attacks.
-        '''
-        airport_info = self._get_airport_info()
-        copied_DG = self.DG.copy()
-        prev_total_max_flow = self._compute_max_flow(copied_DG)
-        prev_percent_diff = 0
-        for seq in range(1, max_attacks + 1):
-            attackable_airports = self._get_attackable_airports(airport_info, max_attack_per_airport)
-            temp_airports = list()
-            temp_flow_vals = list()
-            temp_new_caps = list()
-            for (node, airport) in attackable_airports.items():
-                temp_DG = copied_DG.copy()
-
-                node_in = airport['node_in']
-                node_out = airport['node_out']
-
-                curr_capacity = temp_DG[node_in][node_out]['capacity']
-                new_capacity = self._compute_attack_impact(
-                    curr_capacity,
-                    airport['security_level'],
-                    airport['number_of_attacks'] + 1)
-                new_node = [(
-                    node_in,
-                    node_out,
-                    { 'capacity': new_capacity }
-                )]
-                temp_DG.update(new_node)
-
-                flow_value = nx.maximum_flow_value(temp_DG, 'Source', 'Target')
-                temp_airports.append(node)
-                temp_flow_vals.append(flow_value)
-                temp_new_caps.append(new_capacity)
-                del temp_DG
-
-            idx = np.argmin(temp_flow_vals)
-            airport_iata = temp_airports[idx]
-            curr_airport_data = airport_info[airport_iata]
-            curr_airport_data['sequence'] = seq
-            curr_airport_data['flow_value'] = temp_flow_vals[idx]
-            curr_airport_data['number_of_attacks'] = curr_airport_data['number_of_attacks'] + 1
-            airport_info.update({ airport_iata: curr_airport_data })
-
-            new_capacity = [(
-                airport_iata + '_in',
-                airport_iata + '_out',
-                { 'capacity': temp_new_caps[idx] }
-            )]
-            copied_DG.update(new_capacity)
-            
-#             total_max_flow = self._compute_max_flow(copied_DG)
-            curr_total_max_flow = self._compute_max_flow(copied_DG)
-            curr_percent_diff = self._compute_percentage_diff(prev_total_max_flow, curr_total_max_flow)
-            pts_diff = self._compute_points_diff(prev_percent_diff, curr_percent_diff)
-            self.print_curr_max_flow(seq, airport_iata,
-                                     curr_percent_diff, pts_diff, curr_total_max_flow)
+        number of attacks, printing a LaTeX table row per attack. Takes the
+        same options as iter_min_max_flow.
+
+        Return a DataFrame of the candidate airports (and routes), indexed by
+        IATA code, with their current capacity, number of attacks, sequence of
+        the last attack and the flow value after it.
+        '''
+        rounds = self.iter_min_max_flow(max_attacks, max_attack_per_airport, **kwargs)
+        while True:
+            try:
+                record = next(rounds)
+            except StopIteration as stop:
+                return stop.value
+            self.print_curr_max_flow(record['seq'], record['iata'], record['percent_diff'],
+                                     record['points_diff'], record['flow_value'])
+
+    async def aiter_min_max_flow(self, *args, **kwargs):
+        '''
+        Asynchronous iter_min_max_flow, running every round in a worker
+        thread so the event loop is not blocked. After the round records, a
+        last record with event 'result' holds the DataFrame of
+        compute_min_max_flow under 'result'.
+        '''
+        import asyncio
+
+        def next_round(rounds):
+            try:
+                return (False, next(rounds))
+            except StopIteration as stop:
+                return (True, stop.value)
+
+        rounds = self.iter_min_max_flow(*args, **kwargs)
+        while True:
+            (done, value) = await asyncio.to_thread(next_round, rounds)
+            if done:
+                yield {'event': 'result', 'result': value}
+                return
+            yield value
+
+    def iter_min_max_flow(self, max_attacks=15, max_attack_per_airport=1, workers=None,
+                          attack_routes=False, callbacks=(), lazy=False, prune=False,
+                          checkpoint=None, checkpoint_every=1, min_drop=None):
+        '''
+        Attack the network greedily until the given maximum number of
+        attacks, yielding a record per attack with the attacked IATA code,
+        its new capacity, the maximum flow and its drop, the percentage and
+        points differences and the round's timings. The attacks stop early
+        once no candidate can be attacked any more. With workers, candidate
+        attacks of each round are evaluated across that many processes,
+        selecting the same attacks as the serial path. With attack_routes,
+        individual routes are candidates too and show up in the result keyed
+        by 'ORIGIN-DEST'.
+
+        With lazy=True, each round only evaluates candidates until the best
+        one is proven, selecting the same attacks as the exhaustive search.
+        With lazy='celf', reductions measured in earlier rounds are reused as
+        bounds as well, and every round reports gap_bound, how much lower the
+        flow of a candidate it skipped could have been. Lazy rounds are
+        evaluated serially.
+
+        With prune, one minimum cut per round settles every candidate that
+        cannot lower the flow or crosses the cut without a solve; num_pruned
+        in the round events counts them.
+
+        Every record also holds the number of candidates, solver and rollback
+        time of the serial path and the residual graph size, and is passed
+        to every callback as well; see TraceRecorder.
+
+        With min_drop, the attacks stop after the first one that lowers the
+        maximum flow by less than min_drop.
+
+        With checkpoint, the attack state and flow are written to that file
+        every checkpoint_every rounds and after the last one. If the file
+        already exists, the run resumes after the round it holds with
+        identical results, so a finished run can also be extended to more
+        attacks without recomputing the first rounds. A checkpoint written
+        for another network or with other max_attack_per_airport,
+        attack_routes or lazy settings is rejected.
+
+        The generator returns the DataFrame compute_min_max_flow returns.
+        '''
+        table = self._get_airport_table()
+        if attack_routes:
+            table = pd.concat([table, self._get_route_table()])
+        copied_network = self.network.copy()
+        state = AttackState(table, table.init_capacity.to_numpy(dtype=np.float64), settings={
+            'network': network_digest(self.network),
+            'max_attack_per_airport': int(max_attack_per_airport),
+            'attack_routes': bool(attack_routes),
+            'lazy': lazy
+        })
+        (last_seq, prev_percent_diff, cached_reductions) = (0, 0, dict())
+        if checkpoint is not None and os.path.exists(checkpoint):
+            (last_seq, flow_value, prev_percent_diff, cached_reductions) = \
+                state.restore(checkpoint, copied_network)
+            max_flow = ComponentMaxFlow(copied_network, flow_value=flow_value)
+        else:
+            max_flow = ComponentMaxFlow(copied_network)
+        prev_total_max_flow = self._compute_max_flow(copied_network)
+        if lazy != 'celf':
+            cached_reductions = None
+        executor = None
+        if workers is not None and workers > 1 and not lazy:
+            executor = evaluation_pool(copied_network, workers)
+        try:
+            for seq in range(last_seq + 1, max_attacks + 1):
+                timer = RoundTimer()
+                max_flow.reset_stats()
+                attackable = state.attackable(max_attack_per_airport)
+                if not len(attackable):
+                    if checkpoint is not None and seq - 1 > last_seq:
+                        state.save(checkpoint, copied_network, seq - 1, max_flow.flow_value,
+                                   prev_percent_diff, cached_reductions)
+                    break
+                new_capacities = self._compute_attack_impact(
+                    state.capacity[attackable],
+                    state.security_level[attackable],
+                    state.number_of_attacks[attackable] + 1)
+                candidates = [(state.names[i], state.arcs[i], state.shares[i] * new_capacity)
+                              for (i, new_capacity) in zip(attackable, new_capacities)]
+                timer.lap('setup')
+
+                known_flow_values = None
+                num_pruned = 0
+                if prune:
+                    known_flow_values = max_flow.resolve_capacities(*_flatten_candidates(candidates))
+                    num_pruned = int((~np.isnan(known_flow_values)).sum())
+                    timer.lap('prune')
+
+                if lazy:
+                    (idx, flow_value, num_evaluated, gap_bound) = self._select_lazy(
+                        max_flow, candidates, cached_reductions, known_flow_values)
+                    timer.lap('evaluate')
+                else:
+                    temp_flow_vals = np.full(len(candidates), np.nan)
+                    if known_flow_values is not None:
+                        temp_flow_vals[:] = known_flow_values
+                    pending = np.flatnonzero(np.isnan(temp_flow_vals))
+                    pending_candidates = [candidates[i] for i in pending]
+                    if executor is None:
+                        results = evaluate_candidates(max_flow, pending_candidates)
+                    else:
+                        results = evaluate_parallel(executor, workers, max_flow, pending_candidates)
+                    temp_flow_vals[pending] = [flow_value for (_, flow_value, _) in results]
+                    timer.lap('evaluate')
+
+                    idx = np.argmin(temp_flow_vals)
+                    flow_value = temp_flow_vals[idx]
+                    (num_evaluated, gap_bound) = (len(pending), 0.0)
+                timer.lap('argmin')
+                (airport_iata, arcs, arc_capacities) = candidates[idx]
+                new_capacity = new_capacities[idx]
+                state.record(attackable[idx], seq, flow_value, new_capacity)
+                if cached_reductions is not None:
+                    cached_reductions.pop(airport_iata, None)
+
+                max_flow.set_capacities(arcs, arc_capacities)
+                timer.lap('commit')
             
-            prev_percent_diff = curr_percent_diff
-            prev_total_max_flow = curr_total_max_flow
+#                 total_max_flow = self._compute_max_flow(copied_DG)
+                curr_total_max_flow = self._compute_max_flow(copied_network)
+                flow_drop = prev_total_max_flow - curr_total_max_flow
+                curr_percent_diff = self._compute_percentage_diff(prev_total_max_flow, curr_total_max_flow)
+                pts_diff = self._compute_points_diff(prev_percent_diff, curr_percent_diff)
             
-#             curr_percentage_diff = self._compute_percentage_diff(curr_total_max_flow, total_max_flow)
+                prev_percent_diff = curr_percent_diff
+                prev_total_max_flow = curr_total_max_flow
+                stop = min_drop is not None and flow_drop < min_drop
 
-        del copied_DG
-        return airport_info
+                if checkpoint is not None and (seq % checkpoint_every == 0 or seq == max_attacks or stop):
+                    state.save(checkpoint, copied_network, seq, max_flow.flow_value,
+                               prev_percent_diff, cached_reductions)
+
+                record = {
+                    'event': 'round',
+                    'seq': seq,
+                    'iata': airport_iata,
+                    'new_capacity': float(new_capacity),
+                    'flow_value': float(curr_total_max_flow),
+                    'flow_drop': float(flow_drop),
+                    'percent_diff': curr_percent_diff,
+                    'points_diff': pts_diff,
+                    'num_candidates': len(candidates),
+                    'num_evaluated': num_evaluated,
+                    'num_pruned': num_pruned,
+                    'gap_bound': gap_bound,
+                    'round_seconds': timer.total()
+                }
+                record.update(timer.seconds)
+                record.update(max_flow.stats)
+                record.update({
+                    'num_nodes': copied_network.num_nodes,
+                    'num_arcs': len(copied_network.head),
+                    'residual_arcs': max_flow.residual_size()
+                })
+                emit(callbacks, record)
+                yield record
+                if stop:
+                    break
+            
+#                 curr_percentage_diff = self._compute_percentage_diff(curr_total_max_flow, total_max_flow)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        del copied_network
+        return state.to_frame()
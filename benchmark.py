@@ -0,0 +1,151 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from flight_data import count_routes, compute_vertices
+from synthetic_data import make_airports, make_routes, make_network, write_flights
+
+STAGES = ['preprocess', 'attack', 'map']
+
+
+# Tracing allocations slows NumPy-heavy code down several times, so wall
+# clock numbers are only comparable between runs with the same setting.
+TRACE_MEMORY = True
+
+
+def measure(func, *args, **kwargs):
+    '''
+    Run the given function, returning its result, wall-clock seconds and
+    peak traced memory in MB (None when memory is not traced).
+    '''
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20 if TRACE_MEMORY else None
+    finally:
+        tracemalloc.stop()
+    return (result, seconds, peak_mb)
+
+
+def _preprocess(flights_path, airport_df):
+    '''
+    Run the preprocessing stages after the raw files have been read.
+    '''
+    edges_df = count_routes(flights_path)
+    return compute_vertices(airport_df, edges_df)
+
+
+def bench_preprocess(scale, seed, directory):
+    '''
+    Time route aggregation and vertex derivation over a synthetic BTS file.
+    '''
+    airport_df = make_airports(scale, seed)
+    edges_df = make_routes(airport_df, scale, seed)
+    flights_path = os.path.join(directory, f'flights_{scale}.csv')
+    write_flights(flights_path, edges_df, seed)
+    return measure(_preprocess, flights_path, airport_df)
+
+
+def bench_attack(scale, seed, max_attacks, workers, selection='lazy'):
+    '''
+    Time the greedy attack simulation on a synthetic route network with the
+    given candidate selection, as in cli.py solve.
+    '''
+    from aviation_network import AviationNetwork
+    (vertices_df, edges_df) = make_network(scale, seed)
+    vertices_df = vertices_df[vertices_df.init_capacity != 0]
+    network = AviationNetwork(vertices_df, edges_df)
+    lazy = {'exhaustive': False, 'lazy': True, 'celf': 'celf'}[selection]
+    return measure(network.compute_min_max_flow, max_attacks=max_attacks, workers=workers, lazy=lazy)
+
+
+def bench_map(scale, seed, directory):
+    '''
+    Time map data generation and HTML export.
+    '''
+    from aviation_map import AviationMap
+    (vertices_df, edges_df) = make_network(scale, seed)
+    filename = os.path.join(directory, f'map_{scale}')
+    return measure(lambda: AviationMap(vertices_df, edges_df).create_map(filename=filename))
+
+
+def run(stages, scales, seed=0, max_attacks=3, workers=None, selection='lazy'):
+    '''
+    Run the given stages at the given scales and yield one result record
+    per run.
+    '''
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            for stage in stages:
+                if stage == 'preprocess':
+                    (_, seconds, peak_mb) = bench_preprocess(scale, seed, directory)
+                elif stage == 'attack':
+                    (_, seconds, peak_mb) = bench_attack(scale, seed, max_attacks, workers, selection)
+                elif stage == 'map':
+                    (_, seconds, peak_mb) = bench_map(scale, seed, directory)
+                else:
+                    raise ValueError(f'Unknown stage: {stage}')
+                yield {
+                    'stage': stage,
+                    'scale': scale,
+                    'seed': seed,
+                    'seconds': round(seconds, 4),
+                    'peak_mb': None if peak_mb is None else round(peak_mb, 2),
+                    'python': platform.python_version()
+                }
+
+
+def main(argv=None):
+    '''
+    Run the benchmarks from the command line, writing one JSON line per run.
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark preprocessing, attack simulation and map export.')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--scales', nargs='+', type=float, default=[1, 10],
+                        help='Sizes relative to processed_data; 100 takes minutes, best with --no-memory.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-attacks', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--selection', choices=['exhaustive', 'lazy', 'celf'], default='lazy',
+                        help='Candidate selection of the attack stage; exhaustive grows about '
+                             'quadratically with the scale.')
+    parser.add_argument('--no-memory', action='store_true', help='Do not trace peak memory.')
+    parser.add_argument('--output', default=None, help='Append JSON lines to this file.')
+    args = parser.parse_args(argv)
+
+    global TRACE_MEMORY
+    TRACE_MEMORY = not args.no_memory
+
+    output = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        for record in run(args.stages, args.scales, args.seed, args.max_attacks, args.workers,
+                          args.selection):
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+
+# Bump when the pickled AviationNetwork layout changes.
+CACHE_VERSION = 1
+
+
+def preprocess(raw_dir, output_dir, window=None):
+    '''
+    Run the preprocess.py pipeline on the raw data in raw_dir, writing
+    edges.csv, vertices.csv and the columnar network to output_dir. Return
+    the network directory.
+    '''
+    from flight_data import read_airports
+    from network_data import preprocess_flights
+    airport_df = read_airports(os.path.join(raw_dir, 'airport-codes.csv'))
+    preprocess_flights(airport_df, raw_dir, output_dir, window)
+    return os.path.join(output_dir, 'network')
+
+
+def load_network_data(network_dir, all_regions=False, air_force_bases=False, unserved=False):
+    '''
+    Load the columnar network, keeping by default only airports in charge
+    that are not air force bases and have flights, as analyze.py does.
+    '''
+    import numpy as np
+    from network_data import NetworkData
+    network_data = NetworkData.load(network_dir)
+    vertices = network_data.vertices
+    mask = np.ones(len(vertices['iata']), dtype=bool)
+    if not all_regions:
+        mask &= vertices['in_charge']
+    if not air_force_bases:
+        mask &= ~vertices['air_force_base']
+    if not unserved:
+        mask &= vertices['init_capacity'] != 0
+    return network_data.select(mask)
+
+
+def _cache_key(network_dir, filters, routes):
+    '''
+    Key a cached network by the size and modification time of every file of
+    the columnar network and by the filters applied to it.
+    '''
+    files = list()
+    for name in sorted(os.listdir(network_dir)):
+        stat = os.stat(os.path.join(network_dir, name))
+        files.append([name, stat.st_size, stat.st_mtime_ns])
+    key = json.dumps([CACHE_VERSION, os.path.abspath(network_dir), files, filters, routes])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def load_aviation_network(network_dir, filters, routes=True, cache_dir=None):
+    '''
+    Get the AviationNetwork of the filtered columnar network. With
+    cache_dir, the built network is pickled there and reused while the
+    network files and filters stay the same.
+    '''
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, f'{_cache_key(network_dir, filters, routes)}.pkl')
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+
+    from aviation_network import AviationNetwork
+    network_data = load_network_data(network_dir, **filters)
+    aviation_network = AviationNetwork(network_data.vertices_df(),
+                                       network_data.edges_df() if routes else None)
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f'{cache_path}.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(aviation_network, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    return aviation_network
+
+
+def export_map(network_dir, filters, filename, precision=None, min_flights=None):
+    '''
+    Write the Kepler map of the filtered network. Only this stage imports
+    the visualization dependencies.
+    '''
+    from aviation_map import AviationMap
+    network_data = load_network_data(network_dir, **filters)
+    aviation_map = AviationMap.from_network_data(network_data)
+    aviation_map.create_map(filename=filename, precision=precision, min_flights=min_flights)
+
+
+def solve(args, filters, output=None):
+    '''
+    Run the attack simulation, writing a JSON line per attack to output,
+    standard output by default.
+    '''
+    output = sys.stdout if output is None else output
+    aviation_network = load_aviation_network(
+        args.network, filters, routes=not args.no_routes,
+        cache_dir=None if args.no_cache else args.cache_dir)
+    lazy = {'exhaustive': False, 'lazy': True, 'celf': 'celf'}[args.selection]
+    callbacks = list()
+    if args.trace is not None:
+        from instrumentation import TraceRecorder
+        callbacks.append(TraceRecorder(args.trace))
+
+    rounds = aviation_network.iter_min_max_flow(
+        max_attacks=args.max_attacks,
+        max_attack_per_airport=args.max_attack_per_airport,
+        workers=args.workers,
+        attack_routes=args.attack_routes,
+        callbacks=callbacks,
+        lazy=lazy,
+        prune=args.prune,
+        checkpoint=args.checkpoint,
+        min_drop=args.min_drop)
+    fields = ['seq', 'iata', 'new_capacity', 'flow_value', 'flow_drop', 'percent_diff',
+              'points_diff', 'round_seconds']
+    while True:
+        try:
+            record = next(rounds)
+        except StopIteration as stop:
+            results = stop.value
+            break
+        output.write(json.dumps({field: record[field] for field in fields}, default=float) + '\n')
+        output.flush()
+    if args.output is not None:
+        results.to_csv(args.output)
+    return results
+
+
+def optimal(args, filters, output=None):
+    '''
+    Search the attacks that lower the maximum flow the most, writing the
+    summary with its gap to the greedy attacks as a JSON line.
+    '''
+    output = sys.stdout if output is None else output
+    from optimal_attack import OptimalAttackSearch
+    aviation_network = load_aviation_network(
+        args.network, filters, routes=not args.no_routes,
+        cache_dir=None if args.no_cache else args.cache_dir)
+    summary = OptimalAttackSearch(aviation_network).solve(
+        num_attacks=args.max_attacks,
+        max_attack_per_airport=args.max_attack_per_airport,
+        time_budget=args.time_budget,
+        workers=args.workers)
+    output.write(json.dumps(summary, default=float) + '\n')
+    return summary
+
+
+def main(argv=None):
+    '''
+    Run the preprocess, solve, optimal and map stages from the command line.
+    '''
+    parser = argparse.ArgumentParser(description='Preprocess flight data, attack the route network and export maps.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    filter_parser = argparse.ArgumentParser(add_help=False)
+    filter_parser.add_argument('--network', default='./processed_data/network',
+                               help='Directory of the columnar network.')
+    filter_parser.add_argument('--all-regions', action='store_true',
+                               help='Keep airports outside the region in charge.')
+    filter_parser.add_argument('--air-force-bases', action='store_true',
+                               help='Keep air force bases.')
+    filter_parser.add_argument('--unserved', action='store_true',
+                               help='Keep airports without flights.')
+
+    preprocess_parser = subparsers.add_parser('preprocess', help='Build the columnar network from raw data.')
+    preprocess_parser.add_argument('--raw-dir', default='./raw_data')
+    preprocess_parser.add_argument('--output-dir', default='./processed_data')
+    preprocess_parser.add_argument('--window', type=int, default=None,
+                                   help='Only count the last this many months.')
+
+    solve_parser = subparsers.add_parser('solve', parents=[filter_parser],
+                                         help='Attack the network, one JSON line per attack.')
+    solve_parser.add_argument('--max-attacks', type=int, default=15)
+    solve_parser.add_argument('--max-attack-per-airport', type=int, default=1)
+    solve_parser.add_argument('--workers', type=int, default=None,
+                              help='Evaluate candidates in this many processes; needs --selection exhaustive.')
+    solve_parser.add_argument('--selection', choices=['exhaustive', 'lazy', 'celf'], default='lazy')
+    solve_parser.add_argument('--prune', action='store_true')
+    solve_parser.add_argument('--attack-routes', action='store_true')
+    solve_parser.add_argument('--no-routes', action='store_true',
+                              help='Model each airport on its own, without the route network.')
+    solve_parser.add_argument('--min-drop', type=float, default=None)
+    solve_parser.add_argument('--checkpoint', default=None)
+    solve_parser.add_argument('--trace', default=None, help='Append round events to this JSON lines file.')
+    solve_parser.add_argument('--output', default=None, help='Write the final airport table to this CSV.')
+    solve_parser.add_argument('--cache-dir', default='./processed_data/cache')
+    solve_parser.add_argument('--no-cache', action='store_true')
+    solve_parser.add_argument('--map', default=None, help='Also export the map to this file name.')
+    solve_parser.add_argument('--precision', type=int, default=None,
+                              help='Round map coordinates to this many decimals.')
+    solve_parser.add_argument('--min-flights', type=int, default=None,
+                              help='Leave routes with fewer flights off the map.')
+
+    optimal_parser = subparsers.add_parser('optimal', parents=[filter_parser],
+                                           help='Search the worst attacks exactly and compare them to greedy.')
+    optimal_parser.add_argument('--max-attacks', type=int, default=3)
+    optimal_parser.add_argument('--max-attack-per-airport', type=int, default=1)
+    optimal_parser.add_argument('--time-budget', type=float, default=None,
+                                help='Stop the search after this many seconds.')
+    optimal_parser.add_argument('--workers', type=int, default=None)
+    optimal_parser.add_argument('--no-routes', action='store_true',
+                                help='Model each airport on its own, without the route network.')
+    optimal_parser.add_argument('--cache-dir', default='./processed_data/cache')
+    optimal_parser.add_argument('--no-cache', action='store_true')
+
+    map_parser = subparsers.add_parser('map', parents=[filter_parser], help='Export the Kepler map.')
+    map_parser.add_argument('--output', default='./visualization/ns_flight_map')
+    map_parser.add_argument('--precision', type=int, default=None)
+    map_parser.add_argument('--min-flights', type=int, default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == 'solve' and args.workers is not None and args.workers > 1 \
+            and args.selection != 'exhaustive':
+        solve_parser.error('--workers only applies to --selection exhaustive; '
+                           'lazy and celf selection evaluate candidates serially')
+    if args.command == 'preprocess':
+        preprocess(args.raw_dir, args.output_dir, args.window)
+        return
+
+    filters = {
+        'all_regions': args.all_regions,
+        'air_force_bases': args.air_force_bases,
+        'unserved': args.unserved
+    }
+    if args.command == 'solve':
+        solve(args, filters)
+        if args.map is not None:
+            export_map(args.network, filters, args.map, args.precision, args.min_flights)
+    elif args.command == 'optimal':
+        optimal(args, filters)
+    elif args.command == 'map':
+        export_map(args.network, filters, args.output, args.precision, args.min_flights)
+
+
+if __name__ == '__main__':
+    main()
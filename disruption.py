@@ -0,0 +1,240 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from aviation_network import attacked_capacities
+from instrumentation import emit
+from max_flow import ComponentMaxFlow
+
+# Chance that one disruption hits an airport of each type in a sample,
+# before its security level is taken into account.
+DISRUPTION_RATES = {
+    'small_airport': 0.02,
+    'medium_airport': 0.01,
+    'large_airport': 0.005
+}
+# An airport can be hit by up to this many disruptions in a sample; the
+# third one takes it down, as with attacks.
+MAX_HITS = 3
+
+_worker_state = None
+
+
+def disruption_probabilities(airport_df, rates=DISRUPTION_RATES):
+    '''
+    Get the chance of a disruption hitting each airport: the rate of its
+    facility type, lowered by one percent per security level.
+    '''
+    rate = airport_df.facility_type.map(rates)
+    if rate.isna().any():
+        unknown = airport_df.facility_type[rate.isna()].unique()
+        raise ValueError(f'No disruption rate for facility types: {", ".join(unknown)}')
+    return rate.to_numpy(dtype=np.float64) * (1 - airport_df.security_level.to_numpy() / 100)
+
+
+def _init_worker(network, flow_value, security_level, probabilities):
+    '''
+    Keep a private copy of the solved flow network and the sampling
+    parameters in a worker process.
+    '''
+    global _worker_state
+    max_flow = ComponentMaxFlow(network.copy(), flow_value=flow_value)
+    _worker_state = (max_flow, security_level, probabilities)
+
+
+def _simulate_batch(seed, batch, size):
+    '''
+    Sample a batch in a worker process.
+    '''
+    return sample_losses(*_worker_state, seed, batch, size)
+
+
+def sample_losses(max_flow, security_level, probabilities, seed, batch, size):
+    '''
+    Draw the given number of disruption scenarios and compute the flow lost
+    in each. Every batch has its own random stream derived from the seed,
+    so the samples do not depend on how batches are spread over processes.
+    '''
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(batch,)))
+    hits = rng.binomial(MAX_HITS, probabilities, size=(size, len(probabilities)))
+    network = max_flow.network
+    capacities = network.airport_arc_capacities(
+        attacked_capacities(network.airport_capacity, security_level, hits))
+    flow_values = max_flow.evaluate_capacity_sets(network.airport_arcs.ravel(), capacities.reshape(size, -1))
+    return np.maximum(0, max_flow.flow_value - flow_values)
+
+
+class LossHistogram:
+    '''
+    Running distribution of lost flow in fixed bins between zero and the
+    given upper bound, so memory does not grow with the number of samples.
+    Samples losing no flow are counted exactly.
+    '''
+    def __init__(self, upper, num_bins=100000):
+        self.edges = np.linspace(0, upper, num_bins + 1)
+        self.counts = np.zeros(num_bins, dtype=np.int64)
+        self.num_zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.max = 0.0
+
+    def update(self, values):
+        '''
+        Add the given lost flow values.
+        '''
+        zero = values <= 0
+        self.num_zeros += int(zero.sum())
+        bins = np.searchsorted(self.edges, values[~zero], side='left') - 1
+        np.add.at(self.counts, np.clip(bins, 0, len(self.counts) - 1), 1)
+        self.count += len(values)
+        self.total += values.sum()
+        self.total_sq += np.square(values).sum()
+        if len(values):
+            self.max = max(self.max, values.max())
+
+    def mean(self):
+        '''
+        Get the mean lost flow.
+        '''
+        return self.total / self.count
+
+    def mean_half_width(self, z=1.96):
+        '''
+        Get the half width of the confidence interval of the mean at the
+        given z score.
+        '''
+        variance = max(0.0, self.total_sq / self.count - self.mean() ** 2)
+        return z * np.sqrt(variance / self.count)
+
+    def value_at_rank(self, rank):
+        '''
+        Get the lost flow of the sample of the given (fractional) rank,
+        interpolating within its bin.
+        '''
+        rank = min(max(rank, 0), self.count)
+        if rank <= self.num_zeros:
+            return 0.0
+        rank -= self.num_zeros
+        cumulative = np.cumsum(self.counts)
+        i = min(np.searchsorted(cumulative, rank), len(self.counts) - 1)
+        fraction = (rank - (cumulative[i] - self.counts[i])) / self.counts[i]
+        return self.edges[i] + fraction * (self.edges[i + 1] - self.edges[i])
+
+    def quantile(self, q, z=1.96):
+        '''
+        Get the given quantile of lost flow and a distribution-free
+        confidence interval around it, from the ranks a binomial count of
+        samples below the quantile would have.
+        '''
+        spread = z * np.sqrt(self.count * q * (1 - q))
+        return (self.value_at_rank(q * self.count),
+                self.value_at_rank(q * self.count - spread),
+                self.value_at_rank(q * self.count + spread))
+
+
+class DisruptionSimulator:
+    '''
+    Monte Carlo simulation of random disruptions, such as weather closures
+    and outages, to the airports of an AviationNetwork.
+
+    In every sample each airport is hit by a binomial number of up to
+    MAX_HITS disruptions with the chance from disruption_probabilities, and
+    each hit lowers its capacity as an attack does. The network is solved
+    once, and every sample only repairs that flow.
+    '''
+    def __init__(self, aviation_network, rates=DISRUPTION_RATES, seed=0):
+        airport_df = aviation_network.airport_df
+        self.max_flow = ComponentMaxFlow(aviation_network.network.copy())
+        self.security_level = airport_df.security_level.to_numpy(dtype=np.float64)
+        self.probabilities = disruption_probabilities(airport_df, rates)
+        self.seed = seed
+
+    def _batch_sizes(self, num_samples, batch_size):
+        '''
+        Split the given number of samples into batches.
+        '''
+        for (batch, start) in enumerate(range(0, num_samples, batch_size)):
+            yield (batch, min(batch_size, num_samples - start))
+
+    def _losses(self, num_samples, batch_size, workers):
+        '''
+        Yield the lost flow of every batch in order. With workers, a few
+        batches per worker are kept in flight and the rest are cancelled
+        when the caller stops early.
+        '''
+        batches = self._batch_sizes(num_samples, batch_size)
+        state = (self.max_flow, self.security_level, self.probabilities)
+        if workers is None or workers <= 1:
+            for (batch, size) in batches:
+                yield sample_losses(*state, self.seed, batch, size)
+            return
+
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(self.max_flow.network, self.max_flow.flow_value,
+                      self.security_level, self.probabilities))
+        try:
+            futures = deque()
+            for (batch, size) in batches:
+                futures.append(executor.submit(_simulate_batch, self.seed, batch, size))
+                if len(futures) >= 2 * workers:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def run(self, num_samples=10000, batch_size=1000, workers=None,
+            quantiles=(0.5, 0.9, 0.99), tolerance=None, min_samples=1000,
+            num_bins=100000, callbacks=()):
+        '''
+        Draw up to the given number of samples in batches and return a
+        summary of the lost flow: its mean, the given quantiles and their
+        confidence intervals. The same seed gives the same samples with any
+        number of workers.
+
+        With tolerance, sampling stops once at least min_samples are drawn
+        and the confidence intervals of the mean and every quantile are at
+        most tolerance wide on either side. Every callback is called with
+        the running summary after each batch.
+        '''
+        histogram = LossHistogram(max(self.max_flow.flow_value, 1.0), num_bins)
+        start = time.perf_counter()
+        summary = dict()
+        for (batch, losses) in enumerate(self._losses(num_samples, batch_size, workers)):
+            histogram.update(losses)
+            summary = {
+                'event': 'batch',
+                'batch': batch,
+                'num_samples': histogram.count,
+                'flow_value': self.max_flow.flow_value,
+                'mean': histogram.mean(),
+                'mean_half_width': histogram.mean_half_width(),
+                'max': histogram.max
+            }
+            half_widths = [summary['mean_half_width']]
+            for q in quantiles:
+                (value, low, high) = histogram.quantile(q)
+                summary.update({f'q{q * 100:g}': value,
+                                f'q{q * 100:g}_low': low,
+                                f'q{q * 100:g}_high': high})
+                half_widths.append(max(value - low, high - value))
+            summary['converged'] = bool(tolerance is not None and
+                                        histogram.count >= min_samples and
+                                        max(half_widths) <= tolerance)
+            summary['seconds'] = time.perf_counter() - start
+            emit(callbacks, summary)
+            if summary['converged']:
+                break
+        return summary
@@ -0,0 +1,169 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+from spatial_index import SpatialIndex
+
+ROUTE_COLUMNS = ['origin', 'dest']
+EDGE_COLUMNS = ['origin', 'dest', 'num_of_flights']
+TIMED_ROUTE_COLUMNS = ['origin', 'dest', 'dep_bucket', 'arr_bucket', 'num_of_flights']
+VERTEX_COLUMNS = ['iata', 'name', 'country', 'region', 'latitude', 'longitude',
+                  'facility_type', 'init_capacity', 'security_level', 'in_charge']
+SECURITY_LEVELS = {
+    'small_airport': 10,
+    'medium_airport': 20,
+    'large_airport': 30
+}
+
+
+def read_airports(path, facility_types=tuple(SECURITY_LEVELS), country='US'):
+    '''
+    Read airport-codes.csv, keeping airports of the given facility types in
+    the given country that have an IATA code.
+    '''
+    airport_cols = ['type', 'name', 'iso_country', 'iso_region', 'iata_code', 'coordinates']
+    airport_df = pd.read_csv(path, header=0, usecols=airport_cols)[airport_cols]
+    airport_df.columns = ['facility_type', 'name', 'country', 'region', 'iata', 'coordinates']
+
+    airport_df = airport_df[(airport_df.country == country) &
+                            (airport_df.facility_type.isin(facility_types))]
+    coordinates = airport_df.coordinates.str.split(',', expand=True).astype(float)
+    airport_df = airport_df.assign(latitude=coordinates[0], longitude=coordinates[1])
+    airport_df = airport_df.drop(columns='coordinates').dropna(subset=['iata'])
+    return airport_df.reset_index(drop=True)
+
+
+def count_routes(path, chunksize=1000000, with_months=False):
+    '''
+    Count flights per (origin, dest) route in a BTS on-time report, reading
+    only the origin and dest columns in chunks so memory stays bounded by
+    the number of distinct routes rather than the number of flights.
+
+    With with_months, the FL_DATE column is read as well and the sorted
+    YYYY-MM months the flights fall in are returned next to the counts.
+    '''
+    cols = ROUTE_COLUMNS + ['fl_date'] if with_months else ROUTE_COLUMNS
+    reader = pd.read_csv(path, header=0, usecols=lambda col: col.lower() in cols,
+                         dtype='category', chunksize=chunksize)
+    counts = None
+    dates = set()
+    for chunk in reader:
+        chunk.columns = [col.lower() for col in chunk.columns]
+        partial = chunk.groupby(ROUTE_COLUMNS, observed=True).size()
+        partial.index = partial.index.set_levels(
+            [level.astype(str) for level in partial.index.levels])
+        counts = partial if counts is None else counts.add(partial, fill_value=0)
+        if with_months and 'fl_date' in chunk:
+            dates.update(chunk.fl_date.cat.categories)
+    if not with_months:
+        return _to_edges(counts)
+    months = pd.to_datetime(pd.Series(sorted(dates), dtype=object)).dt.strftime('%Y-%m')
+    return (_to_edges(counts), sorted(set(months)))
+
+
+def _to_minutes(hhmm):
+    '''
+    Turn BTS hhmm clock times into minutes after midnight.
+    '''
+    return (hhmm // 100 * 60 + hhmm % 100) % (24 * 60)
+
+
+def count_timed_routes(path, bucket_minutes=60, by_date=False, chunksize=1000000):
+    '''
+    Count flights per (origin, dest, departure bucket, arrival bucket) in a
+    BTS on-time report from the scheduled departure and arrival times,
+    reading in chunks like count_routes.
+
+    Buckets are bucket_minutes long. By default all dates are folded into
+    one day, and flights landing after midnight land in the last bucket.
+    With by_date, buckets run on across dates, counted from 1970-01-01, and
+    overnight flights land on the next day.
+    '''
+    buckets_per_day = -(-24 * 60 // bucket_minutes)
+    cols = ['fl_date', 'origin', 'dest', 'crs_dep_time', 'crs_arr_time']
+    reader = pd.read_csv(path, header=0, usecols=lambda col: col.lower() in cols,
+                         chunksize=chunksize)
+    counts = None
+    for chunk in reader:
+        chunk.columns = [col.lower() for col in chunk.columns]
+        chunk = chunk.dropna(subset=['crs_dep_time', 'crs_arr_time'])
+        dep_bucket = _to_minutes(chunk.crs_dep_time.to_numpy(dtype=np.int64)) // bucket_minutes
+        arr_bucket = _to_minutes(chunk.crs_arr_time.to_numpy(dtype=np.int64)) // bucket_minutes
+        overnight = arr_bucket < dep_bucket
+        if by_date:
+            day = pd.to_datetime(chunk.fl_date).to_numpy().astype('datetime64[D]').astype(np.int64)
+            dep_bucket = day * buckets_per_day + dep_bucket
+            arr_bucket = day * buckets_per_day + arr_bucket + overnight * buckets_per_day
+        else:
+            arr_bucket = np.where(overnight, buckets_per_day - 1, arr_bucket)
+        partial = pd.DataFrame({
+            'origin': chunk.origin.astype('category'),
+            'dest': chunk.dest.astype('category'),
+            'dep_bucket': dep_bucket,
+            'arr_bucket': arr_bucket
+        }).groupby(TIMED_ROUTE_COLUMNS[:4], observed=True).size()
+        partial.index = partial.index.set_levels(
+            [level.astype(str) for level in partial.index.levels[:2]], level=[0, 1])
+        counts = partial if counts is None else counts.add(partial, fill_value=0)
+    if counts is None:
+        return pd.DataFrame(columns=TIMED_ROUTE_COLUMNS)
+    timed_route_df = counts.astype(np.int64).rename('num_of_flights').reset_index()
+    timed_route_df.columns = TIMED_ROUTE_COLUMNS
+    return timed_route_df
+
+
+def _to_edges(counts):
+    '''
+    Turn a route count Series indexed by (origin, dest) into an edges frame.
+    '''
+    if counts is None:
+        return pd.DataFrame(columns=EDGE_COLUMNS)
+    edges_df = counts.astype(np.int64).rename('num_of_flights').reset_index()
+    edges_df.columns = EDGE_COLUMNS
+    return edges_df
+
+
+def count_flights(edges_df):
+    '''
+    Count the flights departing from or arriving at every airport of the
+    given routes.
+    '''
+    outflow = edges_df.groupby('origin').num_of_flights.sum()
+    inflow = edges_df.groupby('dest').num_of_flights.sum()
+    return outflow.add(inflow, fill_value=0).astype(np.int64)
+
+
+def compute_capacities(iata, edges_df=None, flights=None):
+    '''
+    Compute the initial capacity of the given airports as the number of
+    flights departing from or arriving at each of them, either from the
+    given routes or from precomputed per-airport flight counts.
+    '''
+    if flights is None:
+        flights = count_flights(edges_df)
+    return iata.map(flights).fillna(0).astype(np.int64)
+
+
+def compute_vertices(airport_df, edges_df=None, flights=None):
+    '''
+    Derive init_capacity, security_level and in_charge for every airport.
+    '''
+    security_level = airport_df.facility_type.map(SECURITY_LEVELS)
+    if security_level.isna().any():
+        unknown = airport_df.facility_type[security_level.isna()].unique()
+        raise ValueError(f'Unknown facility types: {list(unknown)}')
+
+    vertices_df = airport_df.assign(
+        init_capacity=compute_capacities(airport_df.iata, edges_df, flights),
+        security_level=security_level.astype(np.int64),
+        in_charge=SpatialIndex.from_frame(airport_df).within_box(
+            max_latitude=40, min_longitude=-130, max_longitude=-85))
+    return vertices_df[VERTEX_COLUMNS]
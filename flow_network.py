@@ -0,0 +1,395 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+
+SOURCE = 0
+TARGET = 1
+EPSILON = 1e-9
+
+
+class FlowNetwork:
+    '''
+    Directed flow network on integer node ids.
+
+    Arcs are stored in CSR order by tail node. Every arc has a paired reverse
+    arc of zero capacity, and flow is kept skew-symmetric
+    (flow[rev[a]] == -flow[a]), so the residual capacity of any arc is
+    capacity[a] - flow[a].
+    '''
+    def __init__(self, num_nodes, tails, heads, capacities, node_names=None):
+        tails = np.asarray(tails, dtype=np.int64)
+        heads = np.asarray(heads, dtype=np.int64)
+        capacities = np.asarray(capacities, dtype=np.float64)
+        num_input_arcs = len(tails)
+
+        all_tails = np.concatenate([tails, heads])
+        all_heads = np.concatenate([heads, tails])
+        all_caps = np.concatenate([capacities, np.zeros(num_input_arcs)])
+        order = np.argsort(all_tails, kind='stable')
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+
+        self.num_nodes = num_nodes
+        self.tail = all_tails[order]
+        self.head = all_heads[order]
+        self.capacity = all_caps[order]
+        self.flow = np.zeros(len(order))
+        self.rev = position[(order + num_input_arcs) % (2 * num_input_arcs)] \
+            if num_input_arcs else np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.tail, minlength=num_nodes), out=self.offsets[1:])
+        self.arc_ids = position[:num_input_arcs]
+        self.node_names = node_names
+
+        self.iata = None
+        self.airport_ids = None
+        self.airport_arcs = None
+        self.airport_shares = None
+        self.airport_capacity = None
+        self.routes = None
+        self.route_ids = None
+        self.route_arcs = None
+
+    @classmethod
+    def from_airports(cls, airport_df, route_df=None):
+        '''
+        Build a network where every airport has a departure side fed by a
+        Source -> iata_dep arc and an arrival side drained by an
+        iata_arr -> Target arc. Airport k gets node ids 2 + 2k (dep) and
+        3 + 2k (arr).
+
+        With route_df, every route adds an origin_dep -> dest_arr arc weighted
+        by num_of_flights, the only arcs from departure to arrival sides, so
+        all flow has to fly the routes. The airport capacity is split over
+        its two arcs by its shares of departures and arrivals. Routes to
+        airports outside airport_df are dropped. Without route_df, every
+        airport's departure side feeds its own arrival side and both arcs
+        get the full airport capacity.
+
+        An airport capacity c gives its arcs c times airport_shares; see
+        airport_arc_capacities.
+        '''
+        iata = airport_df.iata.to_numpy()
+        num_airports = len(iata)
+        airport_ids = {code: k for (k, code) in enumerate(iata)}
+        node_dep = 2 + 2 * np.arange(num_airports)
+        node_arr = node_dep + 1
+
+        if route_df is None:
+            origin = dest = np.arange(num_airports)
+            num_of_flights = np.full(num_airports, np.inf)
+            shares = np.ones((num_airports, 2))
+            routes = list()
+        else:
+            origin = route_df.origin.map(airport_ids)
+            dest = route_df.dest.map(airport_ids)
+            known = (origin.notna() & dest.notna()).to_numpy()
+            origin = origin.to_numpy()[known].astype(np.int64)
+            dest = dest.to_numpy()[known].astype(np.int64)
+            num_of_flights = route_df.num_of_flights.to_numpy(dtype=np.float64)[known]
+            flights = np.stack([np.bincount(origin, num_of_flights, minlength=num_airports),
+                                np.bincount(dest, num_of_flights, minlength=num_airports)], axis=1)
+            total = flights.sum(axis=1, keepdims=True)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                shares = np.where(total > 0, flights / total, 0.5)
+            routes = list(zip(iata[origin], iata[dest]))
+
+        airport_capacity = airport_df.init_capacity.to_numpy(dtype=np.float64)
+        arc_capacities = airport_capacity[:, None] * shares
+        tails = np.concatenate([np.full(num_airports, SOURCE), node_arr, node_dep[origin]])
+        heads = np.concatenate([node_dep, np.full(num_airports, TARGET), node_arr[dest]])
+        capacities = np.concatenate([arc_capacities[:, 0], arc_capacities[:, 1], num_of_flights])
+
+        node_names = ['Source', 'Target']
+        for code in iata:
+            node_names.extend([code + '_dep', code + '_arr'])
+
+        network = cls(2 + 2 * num_airports, tails, heads, capacities, node_names)
+        network.iata = iata
+        network.airport_ids = airport_ids
+        network.airport_arcs = network.arc_ids[:2 * num_airports].reshape(2, num_airports).T.copy()
+        network.airport_shares = shares
+        network.airport_capacity = airport_capacity
+        network.routes = routes
+        network.route_ids = {route: k for (k, route) in enumerate(routes)}
+        network.route_arcs = network.arc_ids[2 * num_airports:2 * num_airports + len(routes)]
+        return network
+
+    def copy(self):
+        '''
+        Copy the capacity and flow buffers, sharing the immutable structure.
+        '''
+        network = object.__new__(FlowNetwork)
+        network.__dict__.update(self.__dict__)
+        network.capacity = self.capacity.copy()
+        network.flow = self.flow.copy()
+        return network
+
+    def components(self, source=SOURCE, target=TARGET):
+        '''
+        Label every node with the weakly connected component it falls in
+        once source and target are removed, numbered from 0, and source and
+        target with -1.
+        '''
+        inner = (self.tail != source) & (self.tail != target) & \
+                (self.head != source) & (self.head != target)
+        (tails, heads) = (self.tail[inner], self.head[inner])
+        # Every node takes the smallest label next to it, and labels jump to
+        # their own label's label, until each component has its smallest id.
+        labels = np.arange(self.num_nodes)
+        while True:
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, tails, labels[heads])
+            new_labels = new_labels[new_labels]
+            if (new_labels == labels).all():
+                break
+            labels = new_labels
+        labels[[source, target]] = -1
+        (_, labels[labels >= 0]) = np.unique(labels[labels >= 0], return_inverse=True)
+        return labels
+
+    def subnetworks(self, labels, source=SOURCE, target=TARGET):
+        '''
+        Split the network by the node labels given by components into one
+        network per component, of the arcs between its nodes, source and
+        target, with their current capacity and flow, and the id in this
+        network of every arc of it. Source and target keep ids SOURCE and
+        TARGET, and the nodes of a component are numbered from 2 in order.
+        Arcs straight from source to target make up one more component
+        without nodes, if there are any. Every arc is visited once.
+        '''
+        num_components = labels.max(initial=-1) + 1
+        nodes = np.argsort(labels, kind='stable')
+        sizes = np.bincount(labels[labels >= 0], minlength=num_components)
+        starts = np.concatenate([[0], np.cumsum(sizes)]) + (labels < 0).sum()
+        local_ids = np.empty(self.num_nodes, dtype=np.int64)
+        local_ids[nodes] = 2 + np.arange(self.num_nodes) - starts[labels[nodes]]
+        local_ids[[source, target]] = [SOURCE, TARGET]
+
+        arc_labels = np.maximum(labels[self.tail[self.arc_ids]], labels[self.head[self.arc_ids]])
+        if (arc_labels < 0).any():
+            arc_labels[arc_labels < 0] = num_components
+            sizes = np.append(sizes, 0)
+        order = np.argsort(arc_labels, kind='stable')
+        bounds = np.cumsum(np.bincount(arc_labels, minlength=len(sizes)))[:-1]
+        for (size, arcs) in zip(sizes, np.split(self.arc_ids[order], bounds)):
+            network = FlowNetwork(2 + size, local_ids[self.tail[arcs]], local_ids[self.head[arcs]],
+                                  self.capacity[arcs])
+            arc_map = np.empty(len(network.head), dtype=np.int64)
+            arc_map[network.arc_ids] = arcs
+            arc_map[network.rev[network.arc_ids]] = self.rev[arcs]
+            network.flow[:] = self.flow[arc_map]
+            yield (network, arc_map)
+
+    def airport_arc(self, iata):
+        '''
+        Get the arc ids of the given airport's Source -> iata_dep and
+        iata_arr -> Target arcs.
+        '''
+        return self.airport_arcs[self.airport_ids[iata]]
+
+    def airport_arc_capacities(self, airport_capacity):
+        '''
+        Get the capacities of the airport arcs, shaped like airport_arcs, when
+        the airports have the given capacities. A matrix with a row of
+        airport capacities per scenario gives one such array per row.
+        '''
+        return np.asarray(airport_capacity, dtype=np.float64)[..., None] * self.airport_shares
+
+    def route_arc(self, origin, dest):
+        '''
+        Get the arc id of the given route's origin_dep -> dest_arr arc.
+        '''
+        return self.route_arcs[self.route_ids[(origin, dest)]]
+
+    def residual(self):
+        '''
+        Get the residual capacity of every arc.
+        '''
+        return self.capacity - self.flow
+
+    def flow_value(self, source=SOURCE):
+        '''
+        Get the net flow leaving the given source.
+        '''
+        return self.flow[self.offsets[source]:self.offsets[source + 1]].sum()
+
+    def out_arcs(self, nodes):
+        '''
+        Get the ids of all arcs leaving the given array of nodes.
+        '''
+        starts = self.offsets[nodes]
+        counts = self.offsets[nodes + 1] - starts
+        total = counts.sum()
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        shifts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return shifts + np.arange(total)
+
+    def bfs(self, start, usable, goal=None):
+        '''
+        Level-synchronous breadth-first search from start over the arcs
+        selected by the boolean mask usable. Stop early once goal is reached.
+        Return the distance of every node (-1 if unreached) and the arc each
+        reached node was first entered by.
+        '''
+        dist = np.full(self.num_nodes, -1, dtype=np.int64)
+        parent_arc = np.full(self.num_nodes, -1, dtype=np.int64)
+        dist[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        level = 0
+        while frontier.size and (goal is None or dist[goal] < 0):
+            level += 1
+            arcs = self.out_arcs(frontier)
+            arcs = arcs[usable[arcs]]
+            heads = self.head[arcs]
+            unseen = dist[heads] < 0
+            (heads, first) = np.unique(heads[unseen], return_index=True)
+            dist[heads] = level
+            parent_arc[heads] = arcs[unseen][first]
+            frontier = heads
+        return (dist, parent_arc)
+
+    def min_cut(self, source=SOURCE, target=TARGET):
+        '''
+        Get the source side of the minimum cut closest to the source (nodes
+        reachable from it in the residual graph) and the sink side of the one
+        closest to the target (nodes that can reach it), as boolean masks.
+        Only meaningful while the flow is maximum.
+        '''
+        residual = self.residual()
+        (dist_from_source, _) = self.bfs(source, residual > EPSILON)
+        # Searching backwards from the target walks arc a = y -> x when its
+        # reverse x -> y has residual capacity.
+        (dist_to_target, _) = self.bfs(target, residual[self.rev] > EPSILON)
+        return (dist_from_source >= 0, dist_to_target >= 0)
+
+    def find_path(self, start, goal, usable):
+        '''
+        Find a shortest path from start to goal over the usable arcs.
+        Return the list of arc ids, or None if goal is unreachable.
+        '''
+        (dist, parent_arc) = self.bfs(start, usable, goal)
+        if dist[goal] < 0:
+            return None
+        path = list()
+        node = goal
+        while node != start:
+            arc = parent_arc[node]
+            path.append(arc)
+            node = self.tail[arc]
+        return path[::-1]
+
+    def push(self, arcs, amount):
+        '''
+        Push the given amount of flow along the given arcs.
+        '''
+        self.flow[arcs] += amount
+        self.flow[self.rev[arcs]] -= amount
+
+    def _scaling_thresholds(self, scaling):
+        '''
+        Get the decreasing residual thresholds of the capacity-scaling
+        phases, ending with EPSILON.
+        '''
+        thresholds = [EPSILON]
+        finite = self.capacity[np.isfinite(self.capacity)]
+        if scaling and finite.size and finite.max() >= 2:
+            top = int(np.log2(finite.max()))
+            thresholds = [2.0 ** k for k in range(top, -1, -1)] + thresholds
+        return thresholds
+
+    def max_flow(self, source=SOURCE, target=TARGET, limit=np.inf, scaling=False, undo_log=None):
+        '''
+        Augment the current flow to a maximum flow with Dinic's algorithm,
+        pushing at most limit more. Return the amount of flow added. With
+        undo_log, every phase appends the arcs it pushed flow on and their
+        previous flow.
+
+        With scaling, arcs are only used while their residual capacity is at
+        least a threshold that halves every phase, so the bulk of the flow is
+        routed along few wide paths first.
+
+        Only the arcs of the level graph of a phase are converted to lists
+        for the path search, and only the arcs pushed on are written back.
+        '''
+        thresholds = self._scaling_thresholds(scaling)
+
+        added = 0.0
+        while limit - added > EPSILON:
+            threshold = thresholds[0]
+            residual = self.capacity - self.flow
+            usable = residual >= threshold
+            (dist, _) = self.bfs(source, usable, target)
+            if dist[target] < 0:
+                if len(thresholds) == 1:
+                    break
+                thresholds.pop(0)
+                continue
+            tail_dist = dist[self.tail]
+            level_arcs = np.flatnonzero(usable & (tail_dist >= 0) &
+                                        (tail_dist < dist[target]) &
+                                        (dist[self.head] == tail_dist + 1))
+            # Arcs are sorted by tail, so those of a node stay contiguous.
+            offsets = np.searchsorted(self.tail[level_arcs], np.arange(self.num_nodes + 1))
+            head = self.head[level_arcs].tolist()
+            tail = self.tail[level_arcs].tolist()
+            left = residual[level_arcs].tolist()
+            pushed = [0.0] * len(level_arcs)
+            pointer = offsets[:-1].tolist()
+            end = offsets[1:].tolist()
+            while limit - added > EPSILON:
+                path = list()
+                node = source
+                while node != target:
+                    while pointer[node] < end[node]:
+                        arc = pointer[node]
+                        if left[arc] >= threshold:
+                            break
+                        pointer[node] += 1
+                    else:
+                        if node == source:
+                            break
+                        arc = path.pop()
+                        node = tail[arc]
+                        pointer[node] += 1
+                        continue
+                    path.append(arc)
+                    node = head[arc]
+                if node != target:
+                    break
+                amount = min(min(left[arc] for arc in path), limit - added)
+                if np.isinf(amount):
+                    raise ValueError('Maximum flow is unbounded.')
+                for arc in path:
+                    left[arc] -= amount
+                    pushed[arc] += amount
+                added += amount
+
+            pushed = np.array(pushed)
+            used = np.flatnonzero(pushed)
+            arcs = level_arcs[used]
+            if undo_log is not None:
+                undo_log.append((arcs, self.flow[arcs]))
+            self.push(arcs, pushed[used])
+        return added
+
+    def to_networkx(self):
+        '''
+        Export the network with its capacities as a networkx DiGraph.
+        '''
+        import networkx as nx
+        names = self.node_names or list(range(self.num_nodes))
+        DG = nx.DiGraph()
+        for arc in self.arc_ids:
+            DG.add_edge(names[self.tail[arc]], names[self.head[arc]],
+                        capacity=float(self.capacity[arc]))
+        return DG
@@ -0,0 +1,85 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import csv
+import json
+import time
+
+
+class RoundTimer:
+    '''
+    Split the wall-clock time of one attack round into named phases.
+    '''
+    def __init__(self):
+        self.seconds = dict()
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def lap(self, phase):
+        '''
+        Charge the time since the previous lap to the given phase.
+        '''
+        now = time.perf_counter()
+        self.seconds[f'{phase}_seconds'] = now - self.last
+        self.last = now
+
+    def total(self):
+        '''
+        Get the time since the round started.
+        '''
+        return self.last - self.start
+
+
+def emit(callbacks, event):
+    '''
+    Send the given event to every callback.
+    '''
+    for callback in callbacks:
+        callback(event)
+
+
+class TraceRecorder:
+    '''
+    Callback that keeps every attack-round event and writes them out as a
+    JSON lines or CSV trace.
+
+    Pass an instance in the callbacks of compute_min_max_flow. With a path,
+    every event is also appended to that JSON lines file as it happens, so
+    long runs can be followed while they are still going.
+    '''
+    def __init__(self, path=None):
+        self.events = list()
+        self.path = path
+
+    def __call__(self, event):
+        self.events.append(event)
+        if self.path is not None:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(event, default=float) + '\n')
+
+    def to_json(self, path):
+        '''
+        Write the recorded events as JSON lines.
+        '''
+        with open(path, 'w') as f:
+            for event in self.events:
+                f.write(json.dumps(event, default=float) + '\n')
+
+    def to_csv(self, path):
+        '''
+        Write the recorded events as CSV, one row per event.
+        '''
+        fieldnames = list()
+        for event in self.events:
+            fieldnames.extend(key for key in event if key not in fieldnames)
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.events)
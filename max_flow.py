@@ -0,0 +1,467 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.2'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from flow_network import EPSILON, SOURCE, TARGET
+
+_worker_max_flow = None
+
+
+class IncrementalMaxFlow:
+    '''
+    Maximum flow of a FlowNetwork that is kept up to date while arc
+    capacities are lowered one at a time.
+
+    The flow of the last solve is kept, and lowering a capacity only repairs
+    the flow around the changed arc instead of solving from scratch. Trial
+    changes are rolled back from an undo log, so candidate attacks can be
+    evaluated without copying the network.
+
+    If flow_value is given, the flow already held by the network is taken
+    to be a maximum flow of that value, e.g. one shipped from another
+    process, and no solve is done. Otherwise the first solve uses capacity
+    scaling unless scaling is False, which is faster on graphs with long
+    paths of uncapped arcs.
+    '''
+    def __init__(self, network, source=SOURCE, target=TARGET, flow_value=None, scaling=True):
+        self.network = network
+        self.source = source
+        self.target = target
+        if flow_value is None:
+            network.flow[:] = 0
+            flow_value = network.max_flow(source, target, scaling=scaling)
+        self.flow_value = flow_value
+        self.stats = dict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        '''
+        Reset the counters of evaluations, augmenting paths and the time
+        spent repairing flows and rolling trial changes back.
+        '''
+        self.stats.update({
+            'evaluations': 0,
+            'paths': 0,
+            'solver_seconds': 0.0,
+            'rollback_seconds': 0.0
+        })
+
+    def resolve_capacities(self, arcs, capacities, groups=None):
+        '''
+        Find the maximum flow value after lowering each of the given arcs to
+        the given capacity, where that can be proven without a solve, from
+        one minimum cut computation. Return the flow values, NaN where a
+        solve is still needed. With groups, a sorted array of the group id
+        of every arc, the arcs of a group are lowered together and a flow
+        value is returned per group.
+
+        An arc whose flow fits the new capacity keeps the flow value. Every
+        augmenting path of a maximum flow crosses a minimum cut once, so when
+        all the arcs losing flow cross the same minimum cut, the flow value
+        drops by exactly their total excess.
+        '''
+        if groups is None:
+            groups = np.arange(len(arcs))
+        num_groups = groups[-1] + 1 if len(groups) else 0
+        excess = np.maximum(0, self.network.flow[arcs] - capacities)
+        lowered = excess > EPSILON
+        (source_crossing, sink_crossing) = self._cut_crossing(arcs)
+        resolved = (np.bincount(groups, lowered & ~source_crossing, minlength=num_groups) == 0) | \
+                   (np.bincount(groups, lowered & ~sink_crossing, minlength=num_groups) == 0)
+
+        flow_values = np.full(num_groups, np.nan)
+        lost = np.bincount(groups, np.where(lowered, excess, 0), minlength=num_groups)
+        flow_values[resolved] = self.flow_value - lost[resolved]
+        return flow_values
+
+    def resolve_capacity_sets(self, arcs, capacities):
+        '''
+        Like resolve_capacities, but for lowering the given arcs together to
+        each row of the given capacity matrix.
+        '''
+        excess = np.maximum(0, self.network.flow[arcs] - capacities)
+        lowered = excess > EPSILON
+        (source_crossing, sink_crossing) = self._cut_crossing(arcs)
+        resolved = (~(lowered & ~source_crossing)).all(axis=1) | \
+                   (~(lowered & ~sink_crossing)).all(axis=1)
+
+        flow_values = np.full(len(capacities), np.nan)
+        flow_values[resolved] = self.flow_value - excess[resolved].sum(axis=1)
+        return flow_values
+
+    def _cut_crossing(self, arcs):
+        '''
+        Find which of the given arcs cross the source side and the sink side
+        minimum cuts.
+        '''
+        network = self.network
+        (source_side, sink_side) = network.min_cut(self.source, self.target)
+        (tails, heads) = (network.tail[arcs], network.head[arcs])
+        return (source_side[tails] & ~source_side[heads],
+                ~sink_side[tails] & sink_side[heads])
+
+    def residual_size(self):
+        '''
+        Count the arcs that have residual capacity left.
+        '''
+        return int((self.network.residual() > EPSILON).sum())
+
+    def get_capacity(self, arc):
+        '''
+        Get the current capacity of the given arc.
+        '''
+        return self.network.capacity[arc]
+
+    def get_flow(self, arc):
+        '''
+        Get the current flow on the given arc.
+        '''
+        return self.network.flow[arc]
+
+    def set_capacity(self, arc, capacity):
+        '''
+        Lower the capacity of the given arc and repair the maximum flow.
+        Return the new maximum flow value.
+        '''
+        return self.set_capacities([arc], [capacity])
+
+    def set_capacities(self, arcs, capacities):
+        '''
+        Lower the capacities of the given arcs together and repair the
+        maximum flow. Return the new maximum flow value.
+        '''
+        self._lower_capacities(arcs, capacities, undo_log=None)
+        return self.flow_value
+
+    def evaluate_capacity(self, arc, capacity):
+        '''
+        Compute the maximum flow value as if the given arc had the given
+        capacity, leaving the network unchanged.
+        '''
+        return self.evaluate_capacities([arc], [capacity])
+
+    def evaluate_capacities(self, arcs, capacities):
+        '''
+        Compute the maximum flow value as if the given arcs had the given
+        capacities, leaving the network unchanged.
+        '''
+        network = self.network
+        undo_log = list()
+        prev_capacities = network.capacity[arcs]
+        prev_flow_value = self.flow_value
+        start = time.perf_counter()
+        self._lower_capacities(arcs, capacities, undo_log)
+        flow_value = self.flow_value
+        solved = time.perf_counter()
+
+        for (undo_arcs, flow) in reversed(undo_log):
+            network.flow[undo_arcs] = flow
+            network.flow[network.rev[undo_arcs]] = -flow
+        network.capacity[arcs] = prev_capacities
+        self.flow_value = prev_flow_value
+
+        self.stats['evaluations'] += 1
+        self.stats['solver_seconds'] += solved - start
+        self.stats['rollback_seconds'] += time.perf_counter() - solved
+        return flow_value
+
+    def evaluate_capacity_sets(self, arcs, capacities):
+        '''
+        Compute the maximum flow value as if the given arcs were lowered to
+        each row of the given capacity matrix, leaving the network unchanged.
+        Rows settled by a minimum cut need no solve, and the others only
+        lower the arcs whose capacity they change.
+        '''
+        flow_values = self.resolve_capacity_sets(arcs, capacities)
+        current = self.network.capacity[arcs]
+        for i in np.flatnonzero(np.isnan(flow_values)):
+            lowered = capacities[i] < current
+            flow_values[i] = self.evaluate_capacities(arcs[lowered], capacities[i][lowered])
+        return flow_values
+
+    def _lower_capacities(self, arcs, capacities, undo_log):
+        '''
+        Lower the capacities of the given arcs and repair the flow only where
+        a lowered arc was carrying more than it can now.
+        '''
+        lost = 0
+        for (arc, capacity) in zip(arcs, capacities):
+            lost += self._cancel_excess(arc, capacity, undo_log)
+
+        # The cancelled paths may open new augmenting paths elsewhere. One
+        # search after every arc is lowered finds them for all of the arcs.
+        if lost > EPSILON:
+            self.flow_value += self.network.max_flow(self.source, self.target, lost,
+                                                     undo_log=undo_log)
+
+    def _cancel_excess(self, arc, capacity, undo_log):
+        '''
+        Lower the capacity of the given arc, rerouting the flow it can no
+        longer carry where possible and cancelling the rest. Return the flow
+        value lost.
+        '''
+        network = self.network
+        if capacity > network.capacity[arc]:
+            raise ValueError(f'Capacity of arc {arc} can only be lowered.')
+        network.capacity[arc] = capacity
+        excess = network.flow[arc] - capacity
+        if excess <= EPSILON:
+            return 0
+        self._push([arc], -excess, undo_log)
+        u = network.tail[arc]
+        v = network.head[arc]
+
+        # Reroute as much of the excess as possible around the lowered arc.
+        excess -= self._push_paths(u, v, excess, False, undo_log)
+
+        # Whatever cannot be rerouted is cancelled back to source and target.
+        if excess <= EPSILON:
+            return 0
+        self._push_paths(self.source, u, excess, True, undo_log)
+        self._push_paths(v, self.target, excess, True, undo_log)
+        self.flow_value -= excess
+        return excess
+
+    def _push(self, arcs, amount, undo_log):
+        '''
+        Push the given amount along the given arcs, recording their flow.
+        '''
+        if undo_log is not None:
+            undo_log.append((arcs, self.network.flow[arcs]))
+        self.network.push(arcs, amount)
+
+    def _push_paths(self, start, goal, amount, cancel, undo_log):
+        '''
+        Repeatedly find a path from start to goal and push flow along it
+        until the given amount has been pushed or no path is left. With
+        cancel, the path runs along arcs carrying flow and the flow on it is
+        cancelled instead. Return the amount pushed.
+        '''
+        if start == goal:
+            return amount
+        network = self.network
+        pushed = 0
+        while amount - pushed > EPSILON:
+            if cancel:
+                usable = network.flow > EPSILON
+            else:
+                usable = network.residual() > EPSILON
+            path = network.find_path(start, goal, usable)
+            if path is None:
+                break
+            if cancel:
+                # Cancelling flow on an arc is a push along its reverse arc.
+                bottleneck = min(network.flow[path].min(), amount - pushed)
+                self._push(path, -bottleneck, undo_log)
+            else:
+                bottleneck = min(network.residual()[path].min(), amount - pushed)
+                self._push(path, bottleneck, undo_log)
+            pushed += bottleneck
+            self.stats['paths'] += 1
+        return pushed
+
+
+class ComponentMaxFlow(IncrementalMaxFlow):
+    '''
+    IncrementalMaxFlow that splits the network into the weakly connected
+    components it falls apart into between source and target, such as
+    airports without routes or regions without flights between them, and
+    keeps a maximum flow of each component on its own.
+
+    Lowering arcs only repairs the components they are in and moves the
+    total flow value by the change, so an evaluation only searches its own
+    component. The flow of every component is mirrored into the network,
+    which stays a maximum flow of the whole.
+    '''
+    def __init__(self, network, source=SOURCE, target=TARGET, flow_value=None, scaling=True):
+        self.network = network
+        self.source = source
+        self.target = target
+        # One solve of the whole network is cheaper than one per component.
+        if flow_value is None:
+            network.flow[:] = 0
+            flow_value = network.max_flow(source, target, scaling=scaling)
+        self.flow_value = flow_value
+
+        self.components = list()
+        self.arc_maps = list()
+        self.arc_component = np.full(len(network.head), -1, dtype=np.int64)
+        self.local_arc = np.full(len(network.head), -1, dtype=np.int64)
+        labels = network.components(source, target)
+        for (component, (subnetwork, arc_map)) in enumerate(network.subnetworks(labels, source, target)):
+            self.arc_component[arc_map] = component
+            self.local_arc[arc_map] = np.arange(len(arc_map))
+            self.arc_maps.append(arc_map)
+            self.components.append(IncrementalMaxFlow(subnetwork, flow_value=subnetwork.flow_value()))
+
+    def load(self, capacity, flow, flow_value):
+        '''
+        Take over the given capacities and maximum flow of the given value,
+        e.g. shipped from another process, for every component without
+        splitting the network again. The arcs must be the same.
+        '''
+        self.network.capacity[:] = capacity
+        self.network.flow[:] = flow
+        self.flow_value = flow_value
+        for (max_flow, arc_map) in zip(self.components, self.arc_maps):
+            max_flow.network.capacity[:] = self.network.capacity[arc_map]
+            max_flow.network.flow[:] = self.network.flow[arc_map]
+            max_flow.flow_value = max_flow.network.flow_value()
+
+    @property
+    def stats(self):
+        '''
+        Sum the counters of every component.
+        '''
+        stats = dict()
+        for max_flow in self.components:
+            for (key, value) in max_flow.stats.items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+    def reset_stats(self):
+        '''
+        Reset the counters of every component.
+        '''
+        for max_flow in self.components:
+            max_flow.reset_stats()
+
+    def _split(self, arcs, capacities):
+        '''
+        Split the given arcs and capacities by the component they are in,
+        keeping their order, as ids of the component's own network.
+        '''
+        arcs = np.asarray(arcs, dtype=np.int64)
+        capacities = np.asarray(capacities, dtype=np.float64)
+        raised = np.flatnonzero(capacities > self.network.capacity[arcs])
+        if len(raised):
+            raise ValueError(f'Capacity of arc {arcs[raised[0]]} can only be lowered.')
+        if len(arcs) == 0:
+            return
+        components = self.arc_component[arcs]
+        if (components == components[0]).all():
+            yield (components[0], self.local_arc[arcs], capacities)
+            return
+        for component in np.unique(components):
+            mask = components == component
+            yield (component, self.local_arc[arcs[mask]], capacities[mask])
+
+    def set_capacities(self, arcs, capacities):
+        '''
+        Lower the capacities of the given arcs together and repair the
+        maximum flow of their components. Return the new maximum flow value.
+        '''
+        for (component, local_arcs, local_capacities) in self._split(arcs, capacities):
+            max_flow = self.components[component]
+            prev_flow_value = max_flow.flow_value
+            max_flow.set_capacities(local_arcs, local_capacities)
+            # Take the value from the flow, as a component rebuilt from the
+            # network, e.g. after a checkpoint, would.
+            max_flow.flow_value = max_flow.network.flow_value()
+            self.flow_value += max_flow.flow_value - prev_flow_value
+            arc_map = self.arc_maps[component]
+            self.network.capacity[arc_map] = max_flow.network.capacity
+            self.network.flow[arc_map] = max_flow.network.flow
+        return self.flow_value
+
+    def evaluate_capacities(self, arcs, capacities):
+        '''
+        Compute the maximum flow value as if the given arcs had the given
+        capacities, only solving the components they are in.
+        '''
+        flow_value = self.flow_value
+        for (component, local_arcs, local_capacities) in self._split(arcs, capacities):
+            max_flow = self.components[component]
+            flow_value += max_flow.evaluate_capacities(local_arcs, local_capacities) - max_flow.flow_value
+        return flow_value
+
+
+def _init_worker(network):
+    '''
+    Keep a private copy of the flow network, split into its components
+    once, in a worker process.
+    '''
+    global _worker_max_flow
+    network = network.copy()
+    _worker_max_flow = ComponentMaxFlow(network, flow_value=network.flow_value())
+
+
+def _evaluate_shard(capacity, flow, flow_value, candidates):
+    '''
+    Evaluate a shard of candidate attacks in a worker process against the
+    given capacity and maximum flow state.
+    '''
+    _worker_max_flow.load(capacity, flow, flow_value)
+    return evaluate_candidates(_worker_max_flow, candidates)
+
+
+def _evaluate_sets_shard(capacity, flow, flow_value, arcs, capacities):
+    '''
+    Evaluate the maximum flow after each row of the given capacity matrix
+    in a worker process against the given capacity and maximum flow state.
+    '''
+    _worker_max_flow.load(capacity, flow, flow_value)
+    return _worker_max_flow.evaluate_capacity_sets(arcs, capacities)
+
+
+def evaluation_pool(network, workers):
+    '''
+    Start a process pool of the given number of workers, each holding a copy
+    of the given flow network for evaluate_parallel and
+    evaluate_sets_parallel. The arcs of the network must not change while
+    the pool is used.
+    '''
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(network,))
+
+
+def evaluate_candidates(max_flow, candidates):
+    '''
+    Evaluate the maximum flow after each of the given
+    (name, arcs, new_capacities) candidate attacks.
+    '''
+    return [(name, max_flow.evaluate_capacities(arcs, new_capacities), new_capacities)
+            for (name, arcs, new_capacities) in candidates]
+
+
+def evaluate_parallel(executor, workers, max_flow, candidates):
+    '''
+    Evaluate candidate attacks as evaluate_candidates does, in shards across
+    the workers of an evaluation_pool, shipping the current capacity and
+    flow state once per shard. Results come back in the same order as the
+    given candidates.
+    '''
+    network = max_flow.network
+    shards = [candidates[i::workers] for i in range(workers)]
+    futures = [executor.submit(_evaluate_shard, network.capacity, network.flow,
+                               max_flow.flow_value, shard)
+               for shard in shards if shard]
+    results = [None] * len(candidates)
+    for (i, future) in enumerate(futures):
+        results[i::workers] = future.result()
+    return results
+
+
+def evaluate_sets_parallel(executor, workers, max_flow, arcs, capacities):
+    '''
+    Evaluate the maximum flow after each row of the given capacity matrix as
+    evaluate_capacity_sets does, in shards of rows across the workers of an
+    evaluation_pool.
+    '''
+    network = max_flow.network
+    flow_values = np.empty(len(capacities))
+    shards = [np.arange(i, len(capacities), workers) for i in range(workers)]
+    futures = [executor.submit(_evaluate_sets_shard, network.capacity, network.flow,
+                               max_flow.flow_value, arcs, capacities[shard])
+               for shard in shards if len(shard)]
+    for (shard, future) in zip(shards, futures):
+        flow_values[shard] = future.result()
+    return flow_values
@@ -0,0 +1,146 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import numpy as np
+import pandas as pd
+from glob import glob
+from flight_data import EDGE_COLUMNS, VERTEX_COLUMNS, compute_vertices
+from route_store import RouteStore
+
+STRING_COLUMNS = ['iata', 'name', 'country', 'region', 'facility_type']
+NUMERIC_COLUMNS = ['latitude', 'longitude', 'init_capacity', 'security_level', 'in_charge',
+                   'air_force_base']
+
+
+class NetworkData:
+    '''
+    Columnar airport and route tables with IATA codes dictionary-encoded to
+    integer airport ids.
+
+    Numeric columns are stored as one .npy file each and memory-mapped on
+    load, so only the columns a process touches are read, from the page
+    cache when another process read them already. select and the frame
+    methods copy the rows they keep into memory. String columns are small
+    and kept in a JSON sidecar. Routes refer to airports by id.
+    '''
+    def __init__(self, vertices, edges):
+        self.vertices = vertices
+        self.edges = edges
+
+    @classmethod
+    def from_frames(cls, vertices_df, edges_df):
+        '''
+        Encode vertices.csv- and edges.csv-shaped frames. Routes to airports
+        outside the vertex table are dropped.
+        '''
+        vertices = {col: vertices_df[col].to_numpy() for col in VERTEX_COLUMNS}
+        vertices['air_force_base'] = vertices_df.name.str.contains('Air Force Base').to_numpy()
+
+        airport_ids = pd.Series(np.arange(len(vertices_df), dtype=np.int32), index=vertices_df.iata)
+        origin = edges_df.origin.map(airport_ids)
+        dest = edges_df.dest.map(airport_ids)
+        known = (origin.notna() & dest.notna()).to_numpy()
+        edges = {
+            'origin': origin.to_numpy()[known].astype(np.int32),
+            'dest': dest.to_numpy()[known].astype(np.int32),
+            'num_of_flights': edges_df.num_of_flights.to_numpy()[known]
+        }
+        return cls(vertices, edges)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        '''
+        Load a saved network, memory-mapping its numeric columns.
+        '''
+        with open(os.path.join(directory, 'vertices.json')) as f:
+            vertices = {col: np.array(values, dtype=object) for (col, values) in json.load(f).items()}
+        for col in NUMERIC_COLUMNS:
+            vertices[col] = np.load(os.path.join(directory, f'vertices.{col}.npy'), mmap_mode=mmap_mode)
+        edges = {col: np.load(os.path.join(directory, f'edges.{col}.npy'), mmap_mode=mmap_mode)
+                 for col in EDGE_COLUMNS}
+        return cls(vertices, edges)
+
+    def save(self, directory):
+        '''
+        Save the network as one file per column.
+        '''
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'vertices.json'), 'w') as f:
+            json.dump({col: self.vertices[col].tolist() for col in STRING_COLUMNS}, f)
+        for col in NUMERIC_COLUMNS:
+            np.save(os.path.join(directory, f'vertices.{col}.npy'), np.asarray(self.vertices[col]))
+        for col in EDGE_COLUMNS:
+            np.save(os.path.join(directory, f'edges.{col}.npy'), np.asarray(self.edges[col]))
+
+    def select(self, mask):
+        '''
+        Keep the airports selected by the given boolean mask and the routes
+        between them, re-encoding airport ids. The kept rows are copied out
+        of the memory-mapped columns.
+        '''
+        mask = np.asarray(mask, dtype=bool)
+        new_ids = np.full(len(mask), -1, dtype=np.int32)
+        new_ids[mask] = np.arange(mask.sum(), dtype=np.int32)
+        origin = new_ids[self.edges['origin']]
+        dest = new_ids[self.edges['dest']]
+        known = (origin >= 0) & (dest >= 0)
+
+        vertices = {col: values[mask] for (col, values) in self.vertices.items()}
+        edges = {
+            'origin': origin[known],
+            'dest': dest[known],
+            'num_of_flights': self.edges['num_of_flights'][known]
+        }
+        return NetworkData(vertices, edges)
+
+    def vertices_df(self):
+        '''
+        Get the airports as a vertices.csv-shaped frame.
+        '''
+        return pd.DataFrame({col: self.vertices[col] for col in VERTEX_COLUMNS})
+
+    def edges_df(self):
+        '''
+        Get the routes as an edges.csv-shaped frame.
+        '''
+        iata = self.vertices['iata']
+        return pd.DataFrame({
+            'origin': iata[self.edges['origin']],
+            'dest': iata[self.edges['dest']],
+            'num_of_flights': self.edges['num_of_flights']
+        })
+
+    def to_csv(self, vertices_path, edges_path):
+        '''
+        Export the airports and routes as CSV.
+        '''
+        self.vertices_df().to_csv(vertices_path, index=False)
+        self.edges_df().to_csv(edges_path, index=False)
+
+
+def preprocess_flights(airport_df, raw_dir, output_dir, window=None):
+    '''
+    Count routes of the BTS reports in raw_dir into a route store, derive
+    the vertices of the given airports and write edges.csv, vertices.csv
+    and the columnar network to output_dir. With window, only the last
+    that many months are counted. Return the edges and vertices frames.
+    '''
+    route_store = RouteStore(os.path.join(output_dir, 'route_store'))
+    for path in sorted(glob(os.path.join(raw_dir, '*_T_ONTIME_REPORTING.csv'))):
+        route_store.ingest(path)
+    edges_df = route_store.edges(last=window)
+    vertices_df = compute_vertices(airport_df, flights=route_store.capacities(last=window))
+
+    edges_df.to_csv(os.path.join(output_dir, 'edges.csv'), index=False)
+    vertices_df.to_csv(os.path.join(output_dir, 'vertices.csv'), index=False)
+    NetworkData.from_frames(vertices_df, edges_df).save(os.path.join(output_dir, 'network'))
+    return (edges_df, vertices_df)
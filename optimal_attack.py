@@ -0,0 +1,249 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import numpy as np
+from aviation_network import attacked_capacities
+from flow_network import EPSILON
+from instrumentation import emit
+from max_flow import IncrementalMaxFlow, evaluate_candidates, evaluate_parallel, evaluation_pool
+
+# The third attack takes an airport down, so no attacks past it are searched.
+MAX_ATTACKS_PER_AIRPORT = 3
+
+
+class OptimalAttackSearch:
+    '''
+    Branch and bound search for the attacks on the airports of an
+    AviationNetwork that lower its maximum flow the most, to measure how far
+    the greedy attacks of compute_min_max_flow are from the worst case.
+
+    The greedy attacks are the first incumbent. Every node of the search
+    adds attacks to airports in a fixed order, so each combination is
+    reached once, and keeps the maximum flow after its attacks. Lowering
+    arcs loses at most their flow above the new capacities, so a node whose
+    flow minus the largest such losses its remaining attacks can cause is
+    no lower than the incumbent is pruned. Children crossing a minimum cut
+    are settled without a solve, and flow values are memoized by the
+    numbers of attacks.
+    '''
+    def __init__(self, aviation_network):
+        self.aviation_network = aviation_network
+        self.airport_df = aviation_network.airport_df
+        self.arcs = aviation_network.network.airport_arcs
+        self.shares = aviation_network.network.airport_shares
+        self.iata = self.airport_df.iata.to_numpy()
+        # Capacity of every airport after 0 up to 3 attacks on it.
+        num_airports = len(self.arcs)
+        self.capacities = attacked_capacities(
+            aviation_network.network.airport_capacity,
+            self.airport_df.security_level.to_numpy(dtype=np.float64),
+            np.repeat(np.arange(MAX_ATTACKS_PER_AIRPORT + 1)[:, None], num_airports, axis=1))
+        self.flow_values = dict()
+
+    def _key(self, counts):
+        '''
+        Key the memoized flow values by the numbers of attacks per airport.
+        '''
+        return tuple((int(i), int(counts[i])) for i in np.flatnonzero(counts))
+
+    def _attacks(self, counts):
+        '''
+        Map the IATA codes of attacked airports to their numbers of attacks.
+        '''
+        return {self.iata[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+    def _credits(self, max_flow, counts, airports):
+        '''
+        Get the largest excess per attack that further attacks to each of
+        the given airports can reach over the flow of max_flow.
+        '''
+        flow = max_flow.network.flow[self.arcs[airports]]
+        shares = self.shares[airports]
+        current = counts[airports]
+        best = np.zeros(len(airports))
+        for extra in range(1, self.max_attack_per_airport + 1):
+            allowed = current + extra <= self.max_attack_per_airport
+            capacity = self.capacities[np.minimum(current + extra, MAX_ATTACKS_PER_AIRPORT), airports]
+            excess = np.maximum(0, flow - capacity[:, None] * shares).sum(1)
+            best = np.where(allowed, np.maximum(best, excess / extra), best)
+        return best
+
+    def _drop_bound(self, max_flow, counts, airports, remaining):
+        '''
+        Bound how much the given number of further attacks to the given
+        airports can lower the flow of max_flow, by crediting each attack
+        with the credit of its airport and summing the largest credits.
+        '''
+        credits = np.repeat(self._credits(max_flow, counts, airports),
+                            self.max_attack_per_airport - counts[airports])
+        if len(credits) > remaining:
+            credits = np.partition(credits, len(credits) - remaining)[len(credits) - remaining:]
+        return credits.sum()
+
+    def _evaluate_children(self, max_flow, counts, airports):
+        '''
+        Compute the flow value after one more attack to each of the given
+        airports, from the memo, a minimum cut or a solve.
+        '''
+        flow_values = np.full(len(airports), np.nan)
+        for (i, airport) in enumerate(airports):
+            counts[airport] += 1
+            flow_values[i] = self.flow_values.get(self._key(counts), np.nan)
+            counts[airport] -= 1
+        self.stats['memo_hits'] += int((~np.isnan(flow_values)).sum())
+
+        arcs = self.arcs[airports]
+        new_capacities = self.capacities[counts[airports] + 1, airports][:, None] * self.shares[airports]
+        pending = np.flatnonzero(np.isnan(flow_values))
+        resolved = max_flow.resolve_capacities(
+            arcs[pending].ravel(), new_capacities[pending].ravel(),
+            np.repeat(np.arange(len(pending)), arcs.shape[1]))
+        flow_values[pending] = resolved
+        self.stats['resolved'] += int((~np.isnan(resolved)).sum())
+
+        pending = np.flatnonzero(np.isnan(flow_values))
+        candidates = [(None, arcs[i], new_capacities[i]) for i in pending]
+        if self.executor is None or len(candidates) < 2:
+            results = evaluate_candidates(max_flow, candidates)
+        else:
+            results = evaluate_parallel(self.executor, self.workers, max_flow, candidates)
+        flow_values[pending] = [flow_value for (_, flow_value, _) in results]
+        self.stats['solves'] += len(pending)
+
+        for (airport, flow_value) in zip(airports, flow_values):
+            counts[airport] += 1
+            self.flow_values[self._key(counts)] = flow_value
+            counts[airport] -= 1
+        return flow_values
+
+    def _timed_out(self):
+        '''
+        Check whether the time budget of the search is spent.
+        '''
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def _update_incumbent(self, counts, flow_value):
+        '''
+        Keep the given attacks if they lower the flow below the incumbent.
+        '''
+        if flow_value < self.incumbent_flow_value - self.tolerance:
+            (self.incumbent, self.incumbent_flow_value) = (counts.copy(), flow_value)
+            emit(self.callbacks, {
+                'event': 'incumbent',
+                'attacks': self._attacks(counts),
+                'flow_value': flow_value,
+                'seconds': time.perf_counter() - self.start
+            })
+
+    def _search(self, max_flow, counts, position, remaining):
+        '''
+        Search every way of adding the remaining attacks to the airports
+        from the given position of the search order on.
+        '''
+        order = self.order[position:]
+        order = order[counts[order] < self.max_attack_per_airport]
+        # The children from each one on only attack airports from there on.
+        bounds = np.array([max_flow.flow_value - self._drop_bound(max_flow, counts, order[i:], remaining)
+                           for i in range(len(order))])
+        if not len(order) or bounds[0] >= self.incumbent_flow_value - self.tolerance:
+            self.stats['pruned'] += 1
+            return
+        if self._timed_out():
+            self.open_bound = min(self.open_bound, bounds[0])
+            return
+        self.stats['nodes'] += 1
+
+        order = order[bounds < self.incumbent_flow_value - self.tolerance]
+        flow_values = self._evaluate_children(max_flow, counts, order)
+        for (i, (airport, flow_value)) in enumerate(zip(order, flow_values)):
+            if bounds[i] >= self.incumbent_flow_value - self.tolerance:
+                break
+            if self._timed_out():
+                self.open_bound = min(self.open_bound, bounds[i])
+                break
+            counts[airport] += 1
+            if remaining == 1:
+                self._update_incumbent(counts, flow_value)
+            else:
+                child = IncrementalMaxFlow(max_flow.network.copy(), flow_value=max_flow.flow_value)
+                child.set_capacities(self.arcs[airport],
+                                     self.capacities[counts[airport], airport] * self.shares[airport])
+                self._search(child, counts, self.rank[airport], remaining - 1)
+            counts[airport] -= 1
+
+    def solve(self, num_attacks=3, max_attack_per_airport=1, time_budget=None, workers=None,
+              callbacks=()):
+        '''
+        Find the given number of attacks, at most max_attack_per_airport to
+        an airport, that minimize the maximum flow. With time_budget, the
+        search stops after that many seconds and keeps the best attacks found
+        so far. With workers, the children of every node are evaluated across
+        that many processes.
+
+        Return a summary with the attacks and their flow value, the greedy
+        attacks and how much higher their flow value is, a lower bound on the
+        optimal flow value and whether the attacks are proven optimal. Every
+        callback is called with each improvement and the summary.
+        '''
+        self.max_attack_per_airport = min(max_attack_per_airport, MAX_ATTACKS_PER_AIRPORT)
+        self.callbacks = callbacks
+        self.start = time.perf_counter()
+        self.deadline = None if time_budget is None else self.start + time_budget
+        self.stats = {'nodes': 0, 'solves': 0, 'resolved': 0, 'memo_hits': 0, 'pruned': 0}
+
+        rounds = self.aviation_network.iter_min_max_flow(num_attacks, max_attack_per_airport, lazy=True)
+        greedy = np.zeros(len(self.arcs), dtype=np.int64)
+        airport_ids = {iata: i for (i, iata) in enumerate(self.iata)}
+        max_flow = IncrementalMaxFlow(self.aviation_network.network.copy())
+        greedy_flow_value = max_flow.flow_value
+        for record in rounds:
+            greedy[airport_ids[record['iata']]] += 1
+            greedy_flow_value = record['flow_value']
+        self.flow_values[self._key(greedy)] = greedy_flow_value
+        (self.incumbent, self.incumbent_flow_value) = (greedy.copy(), greedy_flow_value)
+        self.tolerance = EPSILON * max(1.0, abs(max_flow.flow_value))
+        self.open_bound = np.inf
+
+        # Airports that can lower the flow the most are searched first.
+        counts = np.zeros(len(self.arcs), dtype=np.int64)
+        airports = np.arange(len(self.arcs))
+        credits = self._credits(max_flow, counts, airports)
+        self.order = airports[np.lexsort((airports, -credits))]
+        self.rank = np.argsort(self.order)
+        num_attacks = min(num_attacks, self.max_attack_per_airport * len(self.arcs))
+
+        (self.executor, self.workers) = (None, workers)
+        if workers is not None and workers > 1:
+            self.executor = evaluation_pool(max_flow.network, workers)
+        try:
+            if num_attacks > 0:
+                self._search(max_flow, counts, 0, num_attacks)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+
+        lower_bound = min(self.incumbent_flow_value, self.open_bound)
+        summary = {
+            'event': 'solution',
+            'num_attacks': num_attacks,
+            'attacks': self._attacks(self.incumbent),
+            'flow_value': self.incumbent_flow_value,
+            'greedy_attacks': self._attacks(greedy),
+            'greedy_flow_value': greedy_flow_value,
+            'greedy_gap': greedy_flow_value - self.incumbent_flow_value,
+            'lower_bound': lower_bound,
+            'optimality_gap': self.incumbent_flow_value - lower_bound,
+            'optimal': bool(self.open_bound == np.inf),
+            'seconds': time.perf_counter() - self.start
+        }
+        summary.update(self.stats)
+        emit(callbacks, summary)
+        return summary
@@ -0,0 +1,200 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import hashlib
+import pandas as pd
+from flight_data import EDGE_COLUMNS, ROUTE_COLUMNS, count_routes, count_flights
+
+
+def hash_file(path, block_size=1 << 20):
+    '''
+    Compute the SHA-256 hex digest of the given file's content.
+    '''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_csv(frame, path):
+    '''
+    Write the given frame to a temp file and swap it in, so a crash while
+    writing never leaves a partial file at path.
+    '''
+    temp_path = f'{path}.tmp'
+    frame.to_csv(temp_path, index=False)
+    os.replace(temp_path, path)
+
+
+class RouteStore:
+    '''
+    Persistent on-disk store of monthly route counts.
+
+    Every ingested BTS file is recorded in manifest.json by content hash and
+    its route counts are kept as one partition per month, next to running
+    totals of route counts and airport capacities. Ingesting a new month
+    only counts that file and adds it to the totals, and rolling windows
+    are summed from the stored partitions without rereading raw files.
+
+    Every file is written to a temp file and swapped in. The manifest is
+    written after the month partition and before the totals, so a month
+    file without a manifest entry is an incomplete ingest that the next
+    ingest of that month overwrites, and totals that do not add up to the
+    manifest are rebuilt from the partitions when the store is opened.
+    '''
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.routes_path = os.path.join(directory, 'routes.csv')
+        self.capacities_path = os.path.join(directory, 'capacities.csv')
+        os.makedirs(os.path.join(directory, 'months'), exist_ok=True)
+
+        self.months = dict()
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.months = json.load(f)
+        if not self._totals_match():
+            self._rebuild_totals()
+
+    def _month_path(self, label):
+        '''
+        Get the path of the partition holding the given month.
+        '''
+        return os.path.join(self.directory, 'months', f'{label}.csv')
+
+    def ingest(self, path, label=None, chunksize=1000000):
+        '''
+        Add the route counts of the given BTS file to the store under the
+        given month label, by default the YYYY-MM month of its FL_DATE
+        column. Labels must sort in month order for window to work. Files
+        already ingested are skipped. Return the IATA codes whose capacity
+        changed.
+        '''
+        digest = hash_file(path)
+        if any(month['sha256'] == digest for month in self.months.values()):
+            return list()
+        if label is None:
+            (edges_df, months) = count_routes(path, chunksize=chunksize, with_months=True)
+            if len(months) != 1:
+                raise ValueError(f'{path} has flights in {len(months)} months by FL_DATE; '
+                                 'pass the month label explicitly.')
+            label = months[0]
+        else:
+            edges_df = count_routes(path, chunksize=chunksize)
+        if label in self.months:
+            raise ValueError(f'Month {label} was already ingested from different content.')
+
+        _write_csv(edges_df, self._month_path(label))
+        routes = self._read_totals(self.routes_path, ROUTE_COLUMNS)
+        capacities = self._read_totals(self.capacities_path, ['iata'])
+
+        self.months[label] = {
+            'sha256': digest,
+            'source': os.path.basename(path),
+            'num_of_flights': int(edges_df.num_of_flights.sum())
+        }
+        self._write_manifest()
+
+        counts = edges_df.set_index(ROUTE_COLUMNS).num_of_flights
+        flights = count_flights(edges_df)
+        self._write_totals(counts if routes is None else routes.add(counts, fill_value=0),
+                           flights if capacities is None else capacities.add(flights, fill_value=0))
+        return flights.index.tolist()
+
+    def _write_manifest(self):
+        '''
+        Write the manifest through a temp file.
+        '''
+        temp_path = f'{self.manifest_path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.months, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def _write_totals(self, routes, capacities):
+        '''
+        Write the running totals of route counts and airport capacities.
+        '''
+        _write_csv(routes.astype('int64').reset_index(), self.routes_path)
+        _write_csv(capacities.astype('int64').rename('init_capacity').rename_axis('iata').reset_index(),
+                   self.capacities_path)
+
+    def _totals_match(self):
+        '''
+        Check that the running totals hold exactly the flights of the months
+        in the manifest. Every flight counts once per route and twice over
+        the airport capacities.
+        '''
+        num_of_flights = sum(month['num_of_flights'] for month in self.months.values())
+        routes = self._read_totals(self.routes_path, ROUTE_COLUMNS)
+        capacities = self._read_totals(self.capacities_path, ['iata'])
+        if routes is None or capacities is None:
+            return num_of_flights == 0
+        return routes.sum() == num_of_flights and capacities.sum() == 2 * num_of_flights
+
+    def _rebuild_totals(self):
+        '''
+        Sum the running totals again from the partitions of the months in
+        the manifest.
+        '''
+        if not self.months:
+            for path in (self.routes_path, self.capacities_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        edges_df = self.edges(last=len(self.months))
+        self._write_totals(edges_df.set_index(ROUTE_COLUMNS).num_of_flights, count_flights(edges_df))
+
+    def _read_totals(self, path, index_cols):
+        '''
+        Read a running total as a Series, or None before the first ingest.
+        '''
+        if not os.path.exists(path):
+            return None
+        totals = pd.read_csv(path, header=0, keep_default_na=False)
+        return totals.set_index(index_cols).iloc[:, 0]
+
+    def window(self, last):
+        '''
+        Get the labels of the last given number of months.
+        '''
+        if last <= 0:
+            raise ValueError(f'The window must cover at least one month, not {last}.')
+        return sorted(self.months)[-last:]
+
+    def edges(self, last=None):
+        '''
+        Get route counts over all months, or summed over the last given
+        number of months.
+        '''
+        if last is None:
+            routes = self._read_totals(self.routes_path, ROUTE_COLUMNS)
+            if routes is None:
+                return pd.DataFrame(columns=EDGE_COLUMNS)
+            return routes.reset_index()
+
+        partials = [pd.read_csv(self._month_path(label), header=0, keep_default_na=False)
+                    for label in self.window(last)]
+        if not partials:
+            return pd.DataFrame(columns=EDGE_COLUMNS)
+        routes = pd.concat(partials).groupby(ROUTE_COLUMNS).num_of_flights.sum()
+        return routes.reset_index()
+
+    def capacities(self, last=None):
+        '''
+        Get the initial capacity of every airport over all months, or over
+        the last given number of months.
+        '''
+        if last is None:
+            capacities = self._read_totals(self.capacities_path, ['iata'])
+            return pd.Series(dtype='int64') if capacities is None else capacities
+        return count_flights(self.edges(last))
@@ -0,0 +1,136 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    '''
+    Compute great-circle distances in km between the given points in
+    degrees, broadcasting over arrays.
+    '''
+    (lat1, lon1, lat2, lon2) = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SpatialIndex:
+    '''
+    Index of points on the globe for radius, nearest neighbor and region
+    queries with haversine distances.
+
+    Points are kept sorted by latitude, so a radius query only computes
+    distances to the points in the latitude band the radius can reach.
+    '''
+    def __init__(self, latitude, longitude, names=None):
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.names = None if names is None else np.asarray(names)
+        self.order = np.argsort(self.latitude, kind='stable')
+        self.sorted_latitude = self.latitude[self.order]
+
+    @classmethod
+    def from_frame(cls, airport_df):
+        '''
+        Create an index of the airports of a vertices.csv-shaped table.
+        '''
+        return cls(airport_df.latitude, airport_df.longitude, airport_df.iata)
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def _centers(self, latitude, longitude):
+        '''
+        Get the given centers as two flat arrays.
+        '''
+        (latitude, longitude) = np.broadcast_arrays(np.atleast_1d(latitude), np.atleast_1d(longitude))
+        return (latitude.astype(np.float64).ravel(), longitude.astype(np.float64).ravel())
+
+    def query_radius(self, latitude, longitude, radius_km, return_distance=False):
+        '''
+        Find the points within the given radius of each given center. Return
+        a list with an array of point indices per center, sorted by
+        distance, and with return_distance a list of their distances too.
+        '''
+        (latitude, longitude) = self._centers(latitude, longitude)
+        band = np.degrees(radius_km / EARTH_RADIUS_KM)
+        starts = np.searchsorted(self.sorted_latitude, latitude - band, side='left')
+        stops = np.searchsorted(self.sorted_latitude, latitude + band, side='right')
+        (indices, distances) = (list(), list())
+        for (lat, lon, start, stop) in zip(latitude, longitude, starts, stops):
+            candidates = self.order[start:stop]
+            distance = haversine(lat, lon, self.latitude[candidates], self.longitude[candidates])
+            within = np.flatnonzero(distance <= radius_km)
+            nearest = within[np.argsort(distance[within], kind='stable')]
+            indices.append(candidates[nearest])
+            distances.append(distance[nearest])
+        if return_distance:
+            return (indices, distances)
+        return indices
+
+    def query_nearest(self, latitude, longitude, k=1, chunksize=1024):
+        '''
+        Find the k nearest points to each given center. Return the distances
+        and point indices as arrays with a row per center, nearest first.
+        '''
+        (latitude, longitude) = self._centers(latitude, longitude)
+        k = min(k, len(self))
+        distances = np.empty((len(latitude), k))
+        indices = np.empty((len(latitude), k), dtype=np.int64)
+        # Centers are taken in chunks so the distance matrix stays bounded.
+        for start in range(0, len(latitude), chunksize):
+            rows = slice(start, start + chunksize)
+            distance = haversine(latitude[rows, None], longitude[rows, None],
+                                 self.latitude[None, :], self.longitude[None, :])
+            nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+            nearest_distance = np.take_along_axis(distance, nearest, axis=1)
+            ranks = np.argsort(nearest_distance, axis=1, kind='stable')
+            indices[rows] = np.take_along_axis(nearest, ranks, axis=1)
+            distances[rows] = np.take_along_axis(nearest_distance, ranks, axis=1)
+        return (distances, indices)
+
+    def within_box(self, min_latitude=-90, max_latitude=90, min_longitude=-180, max_longitude=180):
+        '''
+        Get a mask of the points strictly inside the given latitude and
+        longitude bounds.
+        '''
+        return ((min_latitude < self.latitude) & (self.latitude < max_latitude) &
+                (min_longitude < self.longitude) & (self.longitude < max_longitude))
+
+    def within_polygon(self, polygon):
+        '''
+        Get a mask of the points inside the given polygon, a sequence of
+        (latitude, longitude) vertices, treating coordinates as planar.
+        '''
+        polygon = np.asarray(polygon, dtype=np.float64)
+        (y, x) = (self.latitude, self.longitude)
+        inside = np.zeros(len(self), dtype=bool)
+        for ((y1, x1), (y2, x2)) in zip(polygon, np.roll(polygon, -1, axis=0)):
+            # Flip for every edge a ray running east from the point crosses.
+            crosses = (y1 > y) != (y2 > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            inside ^= crosses & (x < x_cross)
+        return inside
+
+    def grid_cells(self, cell_km):
+        '''
+        Label every point with the square cell of the given size, e.g. a
+        weather cell, it falls in. Points with the same label share a cell.
+        '''
+        cell_degrees = np.degrees(cell_km / EARTH_RADIUS_KM)
+        rows = np.floor(self.latitude / cell_degrees).astype(np.int64)
+        # Cells span more degrees of longitude towards the poles.
+        row_latitude = np.radians((rows + 0.5) * cell_degrees)
+        columns = np.floor(self.longitude * np.cos(row_latitude) / cell_degrees).astype(np.int64)
+        return np.unique(np.stack([rows, columns], axis=1), axis=0, return_inverse=True)[1].ravel()
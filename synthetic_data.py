@@ -0,0 +1,123 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import string
+import numpy as np
+import pandas as pd
+from flight_data import EDGE_COLUMNS, compute_vertices
+
+# Shape of processed_data at scale 1.
+NUM_AIRPORTS = 1878
+NUM_ROUTES = 5503
+NUM_FLIGHTS = 605979
+FACILITY_TYPES = {
+    'small_airport': 0.56,
+    'medium_airport': 0.35,
+    'large_airport': 0.09
+}
+# How much more likely an airport of each type is to be served by routes.
+ROUTE_WEIGHTS = {
+    'small_airport': 1.0,
+    'medium_airport': 4.0,
+    'large_airport': 40.0
+}
+
+
+def _make_codes(num_codes):
+    '''
+    Make unique IATA-like codes, three letters long while they last and
+    longer beyond that.
+    '''
+    length = 3
+    while 26 ** length < num_codes:
+        length += 1
+    letters = np.array(list(string.ascii_uppercase))
+    digits = np.arange(num_codes)[:, None] // 26 ** np.arange(length - 1, -1, -1) % 26
+    return np.array([''.join(row) for row in letters[digits]])
+
+
+def make_airports(scale=1, seed=0):
+    '''
+    Make an airport table shaped like airport-codes.csv after filtering,
+    with scale times as many airports as processed_data.
+    '''
+    rng = np.random.default_rng(seed)
+    num_airports = int(NUM_AIRPORTS * scale)
+    iata = _make_codes(num_airports)
+    return pd.DataFrame({
+        'facility_type': rng.choice(list(FACILITY_TYPES), num_airports,
+                                    p=list(FACILITY_TYPES.values())),
+        'name': np.char.add(iata.astype(str), ' Airport'),
+        'country': 'US',
+        'region': np.char.add('US-', _make_codes(50)[rng.integers(0, 50, num_airports)]),
+        'iata': iata,
+        'latitude': rng.uniform(19.0, 65.0, num_airports),
+        'longitude': rng.uniform(-160.0, -67.0, num_airports)
+    })
+
+
+def make_routes(airport_df, scale=1, seed=0):
+    '''
+    Make an edges.csv-shaped route table with scale times as many routes and
+    flights as processed_data, concentrated on large airports.
+    '''
+    rng = np.random.default_rng(seed)
+    num_routes = int(NUM_ROUTES * scale)
+    weights = airport_df.facility_type.map(ROUTE_WEIGHTS).to_numpy()
+    weights = weights / weights.sum()
+
+    # Draw extra pairs so that enough distinct routes survive deduplication.
+    routes = pd.DataFrame({
+        'origin': rng.choice(len(airport_df), 3 * num_routes, p=weights),
+        'dest': rng.choice(len(airport_df), 3 * num_routes, p=weights)
+    })
+    routes = routes[routes.origin != routes.dest].drop_duplicates().head(num_routes)
+
+    num_of_flights = rng.lognormal(4.0, 1.0, len(routes))
+    num_of_flights = np.maximum(1, num_of_flights / num_of_flights.sum() * NUM_FLIGHTS * scale)
+    iata = airport_df.iata.to_numpy()
+    return pd.DataFrame({
+        'origin': iata[routes.origin.to_numpy()],
+        'dest': iata[routes.dest.to_numpy()],
+        'num_of_flights': num_of_flights.astype(np.int64)
+    }, columns=EDGE_COLUMNS)
+
+
+def make_network(scale=1, seed=0):
+    '''
+    Make vertices.csv- and edges.csv-shaped tables at the given scale.
+    '''
+    airport_df = make_airports(scale, seed)
+    edges_df = make_routes(airport_df, scale, seed)
+    return (compute_vertices(airport_df, edges_df), edges_df)
+
+
+def write_flights(path, edges_df, seed=0, chunksize=1000000):
+    '''
+    Write a BTS on-time report shaped CSV with one row per flight of the
+    given routes, in chunks so memory stays bounded.
+    '''
+    rng = np.random.default_rng(seed)
+    route_ids = np.repeat(np.arange(len(edges_df)), edges_df.num_of_flights.to_numpy())
+    rng.shuffle(route_ids)
+    origin = edges_df.origin.to_numpy()
+    dest = edges_df.dest.to_numpy()
+    for start in range(0, max(len(route_ids), 1), chunksize):
+        ids = route_ids[start:start + chunksize]
+        dep_time = rng.integers(0, 24, len(ids)) * 100 + rng.integers(0, 60, len(ids))
+        chunk = pd.DataFrame({
+            'FL_DATE': pd.to_datetime('2019-09-01') + pd.to_timedelta(rng.integers(0, 30, len(ids)), 'D'),
+            'OP_UNIQUE_CARRIER': 'XX',
+            'ORIGIN': origin[ids],
+            'DEST': dest[ids],
+            'CRS_DEP_TIME': dep_time,
+            'CRS_ARR_TIME': (dep_time + 200) % 2400
+        })
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
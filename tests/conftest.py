@@ -0,0 +1,57 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_airports(seed, num_airports=8):
+    '''
+    Make a small random vertices.csv-shaped airport table and edges.csv-shaped
+    route table, with airport capacities around their numbers of flights.
+    '''
+    rng = np.random.default_rng(seed)
+    iata = np.array([f'A{k:02d}' for k in range(num_airports)])
+    num_routes = rng.integers(num_airports, 4 * num_airports)
+    origin = rng.integers(0, num_airports, num_routes)
+    dest = rng.integers(0, num_airports, num_routes)
+    keep = origin != dest
+    route_df = pd.DataFrame({
+        'origin': iata[origin[keep]],
+        'dest': iata[dest[keep]],
+        'num_of_flights': rng.integers(1, 50, keep.sum())
+    }).drop_duplicates(['origin', 'dest']).reset_index(drop=True)
+    flights = route_df.groupby('origin').num_of_flights.sum().add(
+        route_df.groupby('dest').num_of_flights.sum(), fill_value=0).reindex(iata, fill_value=0)
+    airport_df = pd.DataFrame({
+        'iata': iata,
+        'name': iata,
+        'country': 'US',
+        'region': 'US-IN',
+        'latitude': 0.0,
+        'longitude': 0.0,
+        'facility_type': 'large_airport',
+        'init_capacity': flights.to_numpy() * rng.uniform(0.3, 1.2, num_airports),
+        'security_level': rng.choice([10, 20, 30], num_airports)
+    })
+    return (airport_df, route_df)
+
+
+@pytest.fixture
+def airports():
+    '''
+    Get the factory of small random airport and route tables.
+    '''
+    return make_airports
@@ -0,0 +1,22 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from aviation_map import AviationMap
+
+
+def test_features_are_built_once(airports):
+    (airport_df, route_df) = airports(0)
+    aviation_map = AviationMap(airport_df, route_df)
+    for name in ['airport_dict', 'airport_list', 'flight_list']:
+        assert getattr(aviation_map, name) is getattr(aviation_map, name)
+    assert sorted(aviation_map.airport_dict) == sorted(airport_df.iata)
+    assert len(aviation_map.airport_list) == len(airport_df)
+    assert len(aviation_map.flight_list) == len(route_df)
+    assert aviation_map.flight_list[0]['geometry']['type'] == 'LineString'
@@ -0,0 +1,185 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from aviation_network import AviationNetwork
+from flow_network import FlowNetwork
+from max_flow import IncrementalMaxFlow
+
+SEEDS = range(6)
+
+
+class Crash(Exception):
+    pass
+
+
+def run_attacks(aviation_network, max_attacks, **kwargs):
+    '''
+    Run iter_min_max_flow to the end and get its records and result table.
+    '''
+    rounds = aviation_network.iter_min_max_flow(max_attacks, **kwargs)
+    records = list()
+    while True:
+        try:
+            records.append(next(rounds))
+        except StopIteration as stop:
+            return (records, stop.value)
+
+
+def attack_sequence(records):
+    '''
+    Get the attacked targets and flow values of the given records.
+    '''
+    return [(record['iata'], record['flow_value']) for record in records]
+
+
+def test_flow_has_to_fly_the_routes(airports):
+    (airport_df, route_df) = airports(0)
+    network = FlowNetwork.from_airports(airport_df, route_df)
+    max_flow = IncrementalMaxFlow(network.copy())
+    assert max_flow.flow_value > 0
+    route_arcs = network.route_arcs
+    assert max_flow.evaluate_capacities(route_arcs, np.zeros(len(route_arcs))) == pytest.approx(0, abs=1e-9)
+
+
+def test_airports_without_routes_carry_their_capacity(airports):
+    (airport_df, _) = airports(0)
+    max_flow = IncrementalMaxFlow(FlowNetwork.from_airports(airport_df).copy())
+    assert max_flow.flow_value == pytest.approx(airport_df.init_capacity.sum())
+
+
+@pytest.mark.parametrize('options', [
+    {'lazy': True},
+    {'prune': True},
+    {'lazy': True, 'prune': True},
+    {'workers': 2},
+    {'workers': 2, 'lazy': True}
+])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_selection_matches_exhaustive(airports, seed, options):
+    (airport_df, route_df) = airports(seed)
+    (expected, expected_table) = run_attacks(AviationNetwork(airport_df, route_df), 6,
+                                             max_attack_per_airport=2)
+    (records, table) = run_attacks(AviationNetwork(airport_df, route_df), 6,
+                                   max_attack_per_airport=2, **options)
+    assert [record['iata'] for record in records] == [record['iata'] for record in expected]
+    assert [record['flow_value'] for record in records] == \
+        pytest.approx([record['flow_value'] for record in expected])
+    assert table.sequence.equals(expected_table.sequence)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_greedy_flow_values_match_scenarios(airports, seed):
+    (airport_df, route_df) = airports(seed)
+    aviation_network = AviationNetwork(airport_df, route_df)
+    (records, _) = run_attacks(aviation_network, 4, max_attack_per_airport=2)
+    iata = list(airport_df.iata)
+    scenarios = np.zeros((len(records), len(iata)), dtype=np.int64)
+    for (i, record) in enumerate(records):
+        scenarios[i:, iata.index(record['iata'])] += 1
+    flow_values = aviation_network.evaluate_scenarios(scenarios)
+    assert flow_values == pytest.approx([record['flow_value'] for record in records])
+
+
+def test_regional_attacks_fall_off_with_distance(airports):
+    (airport_df, route_df) = airports(0)
+    # Airports one degree, about 111 km, apart along the equator.
+    airport_df = airport_df.assign(longitude=np.arange(len(airport_df), dtype=np.float64))
+    aviation_network = AviationNetwork(airport_df, route_df)
+    scenarios = aviation_network.regional_scenarios(['A00', 'A03'], 350, num_attacks=3, falloff=True)
+    assert scenarios.tolist() == [[3, 3, 2, 1, 0, 0, 0, 0], [1, 2, 3, 3, 3, 2, 1, 0]]
+    flat = aviation_network.regional_scenarios(['A00'], 350, num_attacks=3)
+    assert flat.tolist() == [[3, 3, 3, 3, 0, 0, 0, 0]]
+
+    results = aviation_network.evaluate_regional_attacks(['A00', 'A03'], 350, num_attacks=3, falloff=True)
+    flow_values = aviation_network.evaluate_scenarios(np.vstack([np.zeros(len(airport_df), dtype=np.int64),
+                                                                 scenarios]))
+    assert results.index.tolist() == ['A00', 'A03']
+    assert results.num_airports.tolist() == [4, 7]
+    assert results.flow_value.tolist() == pytest.approx(flow_values[1:])
+    assert results.lost_flow.tolist() == pytest.approx(flow_values[0] - flow_values[1:])
+    with pytest.raises(ValueError):
+        aviation_network.regional_scenarios(['ZZZ'], 350)
+
+
+@pytest.mark.parametrize('options', [{}, {'lazy': 'celf', 'prune': True}, {'attack_routes': True}])
+def test_checkpoint_resumes(airports, tmp_path, options):
+    (airport_df, route_df) = airports(1)
+    (expected, expected_table) = run_attacks(AviationNetwork(airport_df, route_df), 10,
+                                             max_attack_per_airport=2, **options)
+
+    checkpoint = str(tmp_path / 'resume.npz')
+    (first, _) = run_attacks(AviationNetwork(airport_df, route_df), 4, max_attack_per_airport=2,
+                             checkpoint=checkpoint, **options)
+    (rest, table) = run_attacks(AviationNetwork(airport_df, route_df), 10, max_attack_per_airport=2,
+                                checkpoint=checkpoint, **options)
+    assert attack_sequence(first + rest) == attack_sequence(expected)
+    pd.testing.assert_frame_equal(table, expected_table)
+
+    def crash(event):
+        if event['seq'] == 7:
+            raise Crash
+
+    checkpoint = str(tmp_path / 'crash.npz')
+    with pytest.raises(Crash):
+        run_attacks(AviationNetwork(airport_df, route_df), 10, max_attack_per_airport=2,
+                    checkpoint=checkpoint, checkpoint_every=3, callbacks=[crash], **options)
+    (rest, table) = run_attacks(AviationNetwork(airport_df, route_df), 10, max_attack_per_airport=2,
+                                checkpoint=checkpoint, **options)
+    assert attack_sequence(rest) == attack_sequence(expected)[6:]
+    pd.testing.assert_frame_equal(table, expected_table)
+
+
+def test_min_drop_stops_after_a_small_drop(airports):
+    (airport_df, route_df) = airports(0)
+    (expected, _) = run_attacks(AviationNetwork(airport_df, route_df), 6)
+    min_drop = expected[2]['flow_drop'] + 1e-9
+    (records, _) = run_attacks(AviationNetwork(airport_df, route_df), 6, min_drop=min_drop)
+    stop = next(i for (i, record) in enumerate(expected) if record['flow_drop'] < min_drop)
+    assert attack_sequence(records) == attack_sequence(expected[:stop + 1])
+
+
+@pytest.mark.parametrize(('options', 'capacity_scale'), [
+    ({'max_attack_per_airport': 1}, 1),
+    ({'attack_routes': True}, 1),
+    ({'lazy': 'celf'}, 1),
+    ({}, 0.5)
+])
+def test_checkpoint_rejects_other_settings(airports, tmp_path, options, capacity_scale):
+    (airport_df, route_df) = airports(1)
+    checkpoint = str(tmp_path / 'resume.npz')
+    run_attacks(AviationNetwork(airport_df, route_df), 3, max_attack_per_airport=2,
+                checkpoint=checkpoint)
+    airport_df = airport_df.assign(init_capacity=airport_df.init_capacity * capacity_scale)
+    with pytest.raises(ValueError):
+        run_attacks(AviationNetwork(airport_df, route_df), 6, checkpoint=checkpoint,
+                    **{'max_attack_per_airport': 2, **options})
+
+def test_stops_once_nothing_is_attackable(airports):
+    (airport_df, route_df) = airports(2, num_airports=4)
+    (records, table) = run_attacks(AviationNetwork(airport_df, route_df), 20, max_attack_per_airport=2)
+    assert len(records) == 8
+    assert (table.number_of_attacks == 2).all()
+
+
+def test_aiter_ends_with_the_result(airports):
+    (airport_df, route_df) = airports(0)
+    (expected, expected_table) = run_attacks(AviationNetwork(airport_df, route_df), 4)
+
+    async def collect():
+        return [record async for record in AviationNetwork(airport_df, route_df).aiter_min_max_flow(4)]
+
+    records = asyncio.run(collect())
+    assert attack_sequence(records[:-1]) == attack_sequence(expected)
+    assert records[-1]['event'] == 'result'
+    pd.testing.assert_frame_equal(records[-1]['result'], expected_table)
@@ -0,0 +1,78 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import pandas as pd
+import pytest
+import cli
+from aviation_network import AviationNetwork
+from network_data import NetworkData
+
+FILTERS = {'all_regions': False, 'air_force_bases': False, 'unserved': False}
+
+
+@pytest.fixture
+def network_dir(tmp_path, airports):
+    '''
+    Save a small random columnar network with every airport in charge.
+    '''
+    (airport_df, route_df) = airports(0)
+    directory = str(tmp_path / 'network')
+    NetworkData.from_frames(airport_df.assign(in_charge=True), route_df).save(directory)
+    return directory
+
+
+def test_solve_writes_attacks_and_table(network_dir, tmp_path, capsys):
+    output_path = str(tmp_path / 'results.csv')
+    cli.main(['solve', '--network', network_dir, '--no-cache', '--max-attacks', '3',
+              '--output', output_path])
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    network_data = cli.load_network_data(network_dir)
+    rounds = AviationNetwork(network_data.vertices_df(), network_data.edges_df()).iter_min_max_flow(
+        max_attacks=3, lazy=True)
+    expected = list(rounds)
+    assert [record['seq'] for record in records] == [1, 2, 3]
+    assert [record['iata'] for record in records] == [record['iata'] for record in expected]
+    assert [record['flow_value'] for record in records] == pytest.approx(
+        [record['flow_value'] for record in expected])
+
+    results_df = pd.read_csv(output_path, index_col=0)
+    assert results_df.sequence.dropna().sort_values().tolist() == [1, 2, 3]
+    assert results_df.sort_values('sequence').index[:3].tolist() == [record['iata'] for record in records]
+
+
+def test_solve_rejects_workers_without_exhaustive_selection(network_dir):
+    for selection in ['lazy', 'celf']:
+        with pytest.raises(SystemExit):
+            cli.main(['solve', '--network', network_dir, '--no-cache', '--workers', '2',
+                      '--selection', selection])
+
+
+def test_cache_key_follows_files_and_filters(network_dir):
+    key = cli._cache_key(network_dir, FILTERS, True)
+    assert cli._cache_key(network_dir, FILTERS, True) == key
+    assert cli._cache_key(network_dir, dict(FILTERS, unserved=True), True) != key
+    assert cli._cache_key(network_dir, FILTERS, False) != key
+
+    path = os.path.join(network_dir, 'edges.num_of_flights.npy')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cli._cache_key(network_dir, FILTERS, True) != key
+
+
+def test_cached_network_is_reused(network_dir, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    network = cli.load_aviation_network(network_dir, FILTERS, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    cached = cli.load_aviation_network(network_dir, FILTERS, cache_dir=cache_dir)
+    assert cached.airport_df.iata.tolist() == network.airport_df.iata.tolist()
+    assert len(os.listdir(cache_dir)) == 1
@@ -0,0 +1,53 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from aviation_network import AviationNetwork
+from disruption import DisruptionSimulator, sample_losses
+
+QUANTILES = (0.1, 0.5, 0.9, 0.99)
+
+
+def drop_seconds(summary):
+    '''
+    Get the given summary without its timing.
+    '''
+    return {key: value for (key, value) in summary.items() if key != 'seconds'}
+
+
+@pytest.mark.parametrize('seed', range(2))
+def test_same_seed_gives_same_summary_with_workers(airports, seed):
+    (airport_df, route_df) = airports(seed)
+    simulator = DisruptionSimulator(AviationNetwork(airport_df, route_df), rates={'large_airport': 0.2},
+                                    seed=seed)
+    serial = simulator.run(num_samples=250, batch_size=40, quantiles=QUANTILES)
+    parallel = simulator.run(num_samples=250, batch_size=40, workers=2, quantiles=QUANTILES)
+    assert serial['num_samples'] == 250
+    assert drop_seconds(parallel) == drop_seconds(serial)
+
+
+@pytest.mark.parametrize('rate', [0.05, 0.3])
+def test_quantiles_match_the_samples(airports, rate):
+    (airport_df, route_df) = airports(0)
+    simulator = DisruptionSimulator(AviationNetwork(airport_df, route_df), rates={'large_airport': rate})
+    summary = simulator.run(num_samples=250, batch_size=40, quantiles=QUANTILES)
+    losses = np.concatenate([
+        sample_losses(simulator.max_flow, simulator.security_level, simulator.probabilities, 0, batch,
+                      min(40, 250 - 40 * batch))
+        for batch in range(7)])
+    # Quantiles are read off the histogram, so they are exact up to a bin.
+    bin_width = simulator.max_flow.flow_value / 100000
+    for q in QUANTILES:
+        assert summary[f'q{q * 100:g}'] == pytest.approx(np.quantile(losses, q, method='inverted_cdf'),
+                                                         abs=bin_width)
+        assert summary[f'q{q * 100:g}_low'] <= summary[f'q{q * 100:g}'] <= summary[f'q{q * 100:g}_high']
+    assert summary['mean'] == pytest.approx(losses.mean())
+    assert summary['max'] == pytest.approx(losses.max())
@@ -0,0 +1,62 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import pytest
+from flight_data import VERTEX_COLUMNS, compute_vertices, count_routes, read_airports
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+AIRPORTS_PATH = os.path.join(DATA_DIR, 'airport-codes.csv')
+FLIGHTS_PATH = os.path.join(DATA_DIR, 'flights.csv')
+
+ROUTES = {
+    ('LAX', 'ORD'): 3,
+    ('LAX', 'PHX'): 1,
+    ('ORD', 'BMG'): 1,
+    ('ORD', 'LAX'): 2,
+    ('PHX', 'LAX'): 1
+}
+
+
+def test_read_airports_keeps_us_airports_with_iata_codes():
+    airport_df = read_airports(AIRPORTS_PATH)
+    assert list(airport_df.iata) == ['LAX', 'ORD', 'PHX', 'BMG']
+    lax = airport_df.iloc[0]
+    assert (lax.latitude, lax.longitude) == pytest.approx((33.9425, -118.408))
+    assert lax.region == 'US-CA'
+
+
+@pytest.mark.parametrize('chunksize', [1, 3, 1000000])
+def test_count_routes_merges_chunks(chunksize):
+    edges_df = count_routes(FLIGHTS_PATH, chunksize=chunksize)
+    assert list(edges_df.columns) == ['origin', 'dest', 'num_of_flights']
+    assert dict(zip(zip(edges_df.origin, edges_df.dest), edges_df.num_of_flights)) == ROUTES
+
+
+def test_count_routes_with_months():
+    (edges_df, months) = count_routes(FLIGHTS_PATH, with_months=True)
+    assert edges_df.num_of_flights.sum() == sum(ROUTES.values())
+    assert months == ['2019-01', '2019-02']
+
+
+def test_compute_vertices():
+    airport_df = read_airports(AIRPORTS_PATH)
+    vertices_df = compute_vertices(airport_df, count_routes(FLIGHTS_PATH)).set_index('iata')
+    assert list(vertices_df.reset_index().columns) == VERTEX_COLUMNS
+    assert vertices_df.init_capacity.to_dict() == {'LAX': 7, 'ORD': 6, 'PHX': 2, 'BMG': 1}
+    assert vertices_df.security_level.to_dict() == {'LAX': 30, 'ORD': 30, 'PHX': 30, 'BMG': 20}
+    assert vertices_df.in_charge.to_dict() == {'LAX': True, 'ORD': False, 'PHX': True, 'BMG': True}
+
+
+def test_unknown_facility_type_is_rejected():
+    airport_df = read_airports(AIRPORTS_PATH)
+    airport_df.loc[0, 'facility_type'] = 'seaplane_base'
+    with pytest.raises(ValueError):
+        compute_vertices(airport_df, count_routes(FLIGHTS_PATH))
@@ -0,0 +1,164 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from flow_network import FlowNetwork
+from max_flow import (ComponentMaxFlow, IncrementalMaxFlow, evaluate_candidates, evaluate_parallel,
+                      evaluate_sets_parallel, evaluation_pool)
+
+nx = pytest.importorskip('networkx')
+
+SEEDS = range(20)
+SOLVERS = [IncrementalMaxFlow, ComponentMaxFlow]
+
+
+def random_network(seed):
+    '''
+    Make a random network without parallel arcs, some of it cut off from
+    the rest.
+    '''
+    rng = np.random.default_rng(seed)
+    num_nodes = rng.integers(4, 14)
+    tails = rng.integers(0, num_nodes, 4 * num_nodes)
+    heads = rng.integers(0, num_nodes, 4 * num_nodes)
+    arcs = np.unique(np.stack([tails, heads], axis=1)[tails != heads], axis=0)
+    capacities = rng.integers(0, 20, len(arcs)).astype(float)
+    return FlowNetwork(num_nodes, arcs[:, 0], arcs[:, 1], capacities)
+
+
+def reference_flow_value(network, capacity):
+    '''
+    Compute the maximum flow value with networkx for the given capacities.
+    '''
+    network = network.copy()
+    network.capacity[:] = capacity
+    DG = network.to_networkx()
+    DG.add_nodes_from([0, 1])
+    return nx.maximum_flow_value(DG, 0, 1)
+
+
+def lowered(network, rng, num_arcs=3):
+    '''
+    Pick random arcs and lower capacities for them.
+    '''
+    arcs = rng.choice(network.arc_ids, min(num_arcs, len(network.arc_ids)), replace=False)
+    return (arcs, np.floor(network.capacity[arcs] * rng.random(len(arcs))))
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_max_flow_matches_networkx(seed, solver):
+    network = random_network(seed)
+    max_flow = solver(network.copy(), scaling=bool(seed % 2))
+    assert max_flow.flow_value == pytest.approx(reference_flow_value(network, network.capacity))
+    assert max_flow.network.flow_value() == pytest.approx(max_flow.flow_value)
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_evaluate_capacity_matches_networkx_and_rolls_back(seed, solver):
+    network = random_network(seed)
+    rng = np.random.default_rng(seed)
+    max_flow = solver(network.copy())
+    (flow, flow_value) = (max_flow.network.flow.copy(), max_flow.flow_value)
+    for _ in range(5):
+        (arcs, capacities) = lowered(network, rng)
+        capacity = network.capacity.copy()
+        capacity[arcs] = capacities
+        assert max_flow.evaluate_capacities(arcs, capacities) == \
+            pytest.approx(reference_flow_value(network, capacity))
+        arc = arcs[0]
+        capacity = network.capacity.copy()
+        capacity[arc] = capacities[0]
+        assert max_flow.evaluate_capacity(arc, capacities[0]) == \
+            pytest.approx(reference_flow_value(network, capacity))
+        assert np.array_equal(max_flow.network.flow, flow)
+        assert np.array_equal(max_flow.network.capacity, network.capacity)
+        assert max_flow.flow_value == flow_value
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_set_capacity_matches_networkx(seed, solver):
+    network = random_network(seed)
+    rng = np.random.default_rng(seed)
+    max_flow = solver(network.copy())
+    for _ in range(5):
+        (arcs, capacities) = lowered(max_flow.network, rng)
+        if rng.random() < 0.5:
+            max_flow.set_capacities(arcs, capacities)
+        else:
+            max_flow.set_capacity(arcs[0], capacities[0])
+        expected = reference_flow_value(network, max_flow.network.capacity)
+        assert max_flow.flow_value == pytest.approx(expected)
+        assert max_flow.network.flow_value() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+def test_no_arcs_leave_the_flow(solver):
+    max_flow = solver(random_network(0).copy())
+    flow_value = max_flow.flow_value
+    assert max_flow.evaluate_capacities([], []) == flow_value
+    assert max_flow.set_capacities([], []) == flow_value
+    assert max_flow.flow_value == flow_value
+
+
+def test_parallel_evaluation_matches_serial():
+    network = random_network(3)
+    rng = np.random.default_rng(3)
+    max_flow = ComponentMaxFlow(network.copy())
+    candidates = [(k, *lowered(network, rng)) for k in range(7)]
+    arcs = network.arc_ids[:4]
+    capacities = np.floor(network.capacity[arcs] * rng.random((5, len(arcs))))
+    with evaluation_pool(max_flow.network, 2) as executor:
+        assert [flow_value for (_, flow_value, _) in evaluate_parallel(executor, 2, max_flow, candidates)] == \
+            pytest.approx([flow_value for (_, flow_value, _) in evaluate_candidates(max_flow, candidates)])
+        assert evaluate_sets_parallel(executor, 2, max_flow, arcs, capacities) == \
+            pytest.approx(max_flow.evaluate_capacity_sets(arcs, capacities))
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+def test_capacity_cannot_be_raised(solver):
+    network = random_network(0)
+    max_flow = solver(network.copy())
+    arc = network.arc_ids[0]
+    with pytest.raises(ValueError):
+        max_flow.evaluate_capacity(arc, network.capacity[arc] + 1)
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_resolved_capacities_match_solves(seed, solver):
+    network = random_network(seed)
+    rng = np.random.default_rng(seed)
+    max_flow = solver(network.copy())
+    candidates = [lowered(network, rng, num_arcs=2) for _ in range(10)]
+    arcs = np.concatenate([arcs for (arcs, _) in candidates])
+    capacities = np.concatenate([capacities for (_, capacities) in candidates])
+    groups = np.repeat(np.arange(len(candidates)), [len(arcs) for (arcs, _) in candidates])
+    resolved = max_flow.resolve_capacities(arcs, capacities, groups)
+    for (flow_value, (arcs, capacities)) in zip(resolved, candidates):
+        if not np.isnan(flow_value):
+            assert flow_value == pytest.approx(max_flow.evaluate_capacities(arcs, capacities))
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_resolved_capacity_sets_match_solves(seed, solver):
+    network = random_network(seed)
+    rng = np.random.default_rng(seed)
+    max_flow = solver(network.copy())
+    (arcs, _) = lowered(network, rng)
+    capacities = np.floor(network.capacity[arcs] * rng.random((10, len(arcs))))
+    resolved = max_flow.resolve_capacity_sets(arcs, capacities)
+    for (flow_value, row) in zip(resolved, capacities):
+        if not np.isnan(flow_value):
+            assert flow_value == pytest.approx(max_flow.evaluate_capacities(arcs, row))
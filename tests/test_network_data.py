@@ -0,0 +1,34 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+from network_data import NetworkData
+
+
+def test_save_load_select_round_trip(tmp_path, airports):
+    (airport_df, route_df) = airports(0)
+    airport_df = airport_df.assign(in_charge=np.arange(len(airport_df)) % 3 != 0)
+    airport_df.loc[1, 'name'] = 'Grissom Air Force Base'
+    NetworkData.from_frames(airport_df, route_df).save(str(tmp_path))
+    network_data = NetworkData.load(str(tmp_path))
+
+    pd.testing.assert_frame_equal(network_data.vertices_df(), airport_df[network_data.vertices_df().columns],
+                                  check_dtype=False)
+    pd.testing.assert_frame_equal(network_data.edges_df(), route_df, check_dtype=False)
+    assert network_data.vertices['air_force_base'].tolist() == [k == 1 for k in range(len(airport_df))]
+
+    mask = network_data.vertices['in_charge'] & ~network_data.vertices['air_force_base']
+    selected = network_data.select(mask)
+    kept = airport_df.iata[mask].tolist()
+    assert selected.vertices_df().iata.tolist() == kept
+    expected_df = route_df[route_df.origin.isin(kept) & route_df.dest.isin(kept)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(selected.edges_df(), expected_df, check_dtype=False)
+    assert not isinstance(selected.vertices['init_capacity'], np.memmap)
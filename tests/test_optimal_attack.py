@@ -0,0 +1,57 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import itertools
+import numpy as np
+import pytest
+from aviation_network import AviationNetwork
+from optimal_attack import OptimalAttackSearch
+
+SEEDS = range(8)
+
+
+def brute_force(aviation_network, num_attacks, max_attack_per_airport):
+    '''
+    Evaluate every way of spreading the attacks over the airports and get
+    the lowest flow value.
+    '''
+    num_airports = len(aviation_network.airport_df)
+    scenarios = [np.bincount(airports, minlength=num_airports)
+                 for airports in itertools.combinations_with_replacement(range(num_airports), num_attacks)]
+    scenarios = np.array([counts for counts in scenarios if counts.max() <= max_attack_per_airport])
+    return aviation_network.evaluate_scenarios(scenarios).min()
+
+
+@pytest.mark.parametrize('attacks', [(2, 1), (3, 1), (3, 2)])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_search_matches_brute_force(airports, seed, attacks):
+    (num_attacks, max_attack_per_airport) = attacks
+    (airport_df, route_df) = airports(seed)
+    aviation_network = AviationNetwork(airport_df, route_df)
+    summary = OptimalAttackSearch(aviation_network).solve(num_attacks, max_attack_per_airport)
+    assert summary['optimal']
+    assert summary['flow_value'] == pytest.approx(brute_force(aviation_network, num_attacks,
+                                                              max_attack_per_airport))
+    assert summary['greedy_gap'] >= -1e-9
+
+    counts = np.zeros(len(airport_df), dtype=np.int64)
+    for (iata, count) in summary['attacks'].items():
+        counts[list(airport_df.iata).index(iata)] = count
+    assert counts.sum() == num_attacks
+    assert aviation_network.evaluate_scenarios(counts[None])[0] == pytest.approx(summary['flow_value'])
+
+
+def test_search_with_workers_matches_serial(airports):
+    (airport_df, route_df) = airports(3)
+    aviation_network = AviationNetwork(airport_df, route_df)
+    serial = OptimalAttackSearch(aviation_network).solve(3, 2)
+    parallel = OptimalAttackSearch(aviation_network).solve(3, 2, workers=2)
+    assert parallel['flow_value'] == pytest.approx(serial['flow_value'])
+    assert parallel['optimal']
@@ -0,0 +1,94 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import pandas as pd
+import pytest
+from route_store import RouteStore
+
+FLIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'flights.csv')
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def monthly_reports(tmp_path):
+    '''
+    Split the fixture BTS report into one file per month.
+    '''
+    flights_df = pd.read_csv(FLIGHTS_PATH, dtype=str)
+    paths = list()
+    for (month, month_df) in flights_df.groupby(flights_df.FL_DATE.str[:7]):
+        path = str(tmp_path / f'{month}_T_ONTIME_REPORTING.csv')
+        month_df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def route_counts(edges_df):
+    '''
+    Map every (origin, dest) route to its number of flights.
+    '''
+    return dict(zip(zip(edges_df.origin, edges_df.dest), edges_df.num_of_flights))
+
+
+def test_reingest_does_not_double_count(tmp_path, monthly_reports):
+    store = RouteStore(str(tmp_path / 'store'))
+    for path in monthly_reports:
+        store.ingest(path)
+    expected = route_counts(store.edges())
+    assert sum(expected.values()) == 8
+
+    for path in monthly_reports:
+        assert store.ingest(path) == []
+    store = RouteStore(str(tmp_path / 'store'))
+    for path in monthly_reports:
+        store.ingest(path)
+    assert route_counts(store.edges()) == expected
+    assert store.capacities().to_dict() == {'BMG': 1, 'LAX': 7, 'ORD': 6, 'PHX': 2}
+
+
+def test_rolling_windows(tmp_path, monthly_reports):
+    store = RouteStore(str(tmp_path / 'store'))
+    for path in monthly_reports:
+        store.ingest(path)
+    assert store.window(1) == ['2019-02']
+    assert route_counts(store.edges(last=1)) == {('LAX', 'PHX'): 1, ('ORD', 'BMG'): 1, ('ORD', 'LAX'): 1}
+    assert store.capacities(last=1).to_dict() == {'BMG': 1, 'LAX': 2, 'ORD': 2, 'PHX': 1}
+    assert route_counts(store.edges(last=2)) == route_counts(store.edges())
+    with pytest.raises(ValueError):
+        store.window(0)
+
+
+@pytest.mark.parametrize('step', ['_write_manifest', '_write_totals'])
+def test_crashed_ingest_is_recovered(tmp_path, monthly_reports, monkeypatch, step):
+    directory = str(tmp_path / 'store')
+    expected = RouteStore(str(tmp_path / 'expected'))
+    for path in monthly_reports:
+        expected.ingest(path)
+
+    store = RouteStore(directory)
+    store.ingest(monthly_reports[0])
+
+    def crash(*args):
+        raise Crash
+    with monkeypatch.context() as patch:
+        patch.setattr(RouteStore, step, crash)
+        with pytest.raises(Crash):
+            RouteStore(directory).ingest(monthly_reports[1])
+
+    store = RouteStore(directory)
+    store.ingest(monthly_reports[1])
+    assert route_counts(store.edges()) == route_counts(expected.edges())
+    assert store.capacities().to_dict() == expected.capacities().to_dict()
+    assert sorted(store.months) == ['2019-01', '2019-02']
+
@@ -0,0 +1,75 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from spatial_index import SpatialIndex, haversine
+
+SEEDS = range(5)
+
+
+def random_points(rng, size):
+    '''
+    Draw random points over most of the globe, across the antimeridian.
+    '''
+    return (rng.uniform(-70, 80, size), rng.uniform(-180, 180, size))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_query_radius_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    (latitude, longitude) = random_points(rng, 300)
+    index = SpatialIndex(latitude, longitude)
+    (centers_lat, centers_lon) = random_points(rng, 20)
+    radius_km = rng.uniform(100, 3000)
+    (indices, distances) = index.query_radius(centers_lat, centers_lon, radius_km, return_distance=True)
+    for (lat, lon, found, found_distance) in zip(centers_lat, centers_lon, indices, distances):
+        distance = haversine(lat, lon, latitude, longitude)
+        assert set(found) == set(np.flatnonzero(distance <= radius_km))
+        assert found_distance == pytest.approx(distance[found])
+        assert (np.diff(found_distance) >= 0).all()
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_query_nearest_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    (latitude, longitude) = random_points(rng, 200)
+    index = SpatialIndex(latitude, longitude)
+    (centers_lat, centers_lon) = random_points(rng, 50)
+    (distances, indices) = index.query_nearest(centers_lat, centers_lon, k=5, chunksize=16)
+    expected = haversine(centers_lat[:, None], centers_lon[:, None], latitude[None, :], longitude[None, :])
+    assert distances == pytest.approx(np.sort(expected, axis=1)[:, :5])
+    assert np.take_along_axis(expected, indices, axis=1) == pytest.approx(distances)
+
+
+def test_query_nearest_caps_k_at_the_number_of_points():
+    index = SpatialIndex([0.0, 1.0, 2.0], [0.0, 0.0, 0.0])
+    (distances, indices) = index.query_nearest(0.9, 0.0, k=10)
+    assert indices.tolist() == [[1, 0, 2]]
+    assert distances.shape == (1, 3)
+
+
+def test_within_polygon():
+    index = SpatialIndex([1, 1, 3, 5, 1, -1], [1, 3, 1, 5, 5, 1])
+    square = [(0, 0), (0, 4), (4, 4), (4, 0)]
+    assert index.within_polygon(square).tolist() == [True, True, True, False, False, False]
+    # An L shape leaves out the corner at (3, 3).
+    ell = [(0, 0), (0, 4), (2, 4), (2, 2), (4, 2), (4, 0)]
+    assert index.within_polygon(ell).tolist() == [True, True, True, False, False, False]
+    assert SpatialIndex([3], [3]).within_polygon(ell).tolist() == [False]
+
+
+def test_grid_cells_group_close_points():
+    # Cells of 111 km are about one degree.
+    index = SpatialIndex([40.2, 40.3, 40.2, 45.2, 40.2], [-86.2, -86.3, -80.2, -86.2, -86.2])
+    labels = index.grid_cells(111.0)
+    assert labels[0] == labels[1] == labels[4]
+    assert len({labels[0], labels[2], labels[3]}) == 3
+    assert sorted(set(labels)) == [0, 1, 2]
@@ -0,0 +1,69 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pytest
+from aviation_network import AviationNetwork
+from flight_data import TIMED_ROUTE_COLUMNS, count_timed_routes
+from max_flow import IncrementalMaxFlow
+from time_expanded import TimeExpandedNetwork
+
+FLIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'flights.csv')
+SEEDS = range(6)
+
+
+def one_bucket_airports(airports, seed):
+    '''
+    Get a random airport table without unserved airports, with capacities
+    equal to the flights of every airport as TimeExpandedNetwork takes
+    them, and its routes.
+    '''
+    (airport_df, route_df) = airports(seed)
+    flights = route_df.groupby('origin').num_of_flights.sum().add(
+        route_df.groupby('dest').num_of_flights.sum(), fill_value=0).reindex(airport_df.iata, fill_value=0)
+    airport_df = airport_df[(flights > 0).to_numpy()].reset_index(drop=True)
+    airport_df['init_capacity'] = flights[airport_df.iata].to_numpy(dtype=np.float64)
+    return (airport_df, route_df)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_one_bucket_matches_aviation_network(airports, seed):
+    (airport_df, route_df) = one_bucket_airports(airports, seed)
+    timed_route_df = route_df.assign(dep_bucket=0, arr_bucket=0)[TIMED_ROUTE_COLUMNS]
+    time_expanded = TimeExpandedNetwork(airport_df, timed_route_df)
+    aviation_network = AviationNetwork(airport_df, route_df)
+    expected = list(aviation_network.iter_min_max_flow(6, 2))
+    records = list(time_expanded.iter_min_max_flow(6, 2))
+    flow_value = IncrementalMaxFlow(aviation_network.network.copy()).flow_value
+    assert time_expanded.max_flow() == pytest.approx(flow_value)
+    assert [record['iata'] for record in records] == [record['iata'] for record in expected]
+    assert [record['flow_value'] for record in records] == \
+        pytest.approx([record['flow_value'] for record in expected])
+    assert all(type(record[key]) is float for record in records for key in ['flow_value', 'flow_drop'])
+
+
+def test_overnight_flights_land_in_the_last_bucket():
+    timed_route_df = count_timed_routes(FLIGHTS_PATH, chunksize=3)
+    routes = {(origin, dest, dep, arr): n for (origin, dest, dep, arr, n)
+              in timed_route_df.itertuples(index=False)}
+    assert routes == {
+        ('LAX', 'ORD', 8, 14): 1, ('LAX', 'ORD', 12, 18): 1, ('LAX', 'ORD', 23, 23): 1,
+        ('ORD', 'LAX', 7, 9): 1, ('ORD', 'LAX', 15, 17): 1, ('PHX', 'LAX', 11, 12): 1,
+        ('LAX', 'PHX', 13, 14): 1, ('ORD', 'BMG', 10, 12): 1
+    }
+
+
+def test_overnight_flights_land_on_the_next_date():
+    timed_route_df = count_timed_routes(FLIGHTS_PATH, bucket_minutes=60, by_date=True)
+    overnight = timed_route_df[(timed_route_df.origin == 'LAX') & (timed_route_df.dep_bucket % 24 == 23)]
+    day = np.datetime64('2019-01-31', 'D').astype(np.int64)
+    assert overnight[['dep_bucket', 'arr_bucket']].values.tolist() == [[day * 24 + 23, (day + 1) * 24 + 5]]
+    assert len(timed_route_df) == 8
@@ -0,0 +1,204 @@
+__author__ = 'So Negishi'
+__copyright__ = 'Copyright 2019, So Negishi'
+__license__ = 'GPL'
+__version__ = '0.0.1'
+__maintainer__ = 'So Negishi'
+__email__ = 'sonegishi_2020@depauw.edu'
+__status__ = 'Development'
+
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+from aviation_network import attack_impact, attacked_capacities
+from flight_data import count_timed_routes
+from flow_network import EPSILON, SOURCE, TARGET, FlowNetwork
+from instrumentation import RoundTimer, emit
+from max_flow import IncrementalMaxFlow
+
+
+class TimeExpandedNetwork:
+    '''
+    Flow network with a layer per time bucket, so that bottlenecks of busy
+    hours limit the flow instead of being averaged away over the day.
+
+    Only active airport-hours, where flights depart or land, get nodes: a
+    departure node fed by Source up to the departures of that bucket and an
+    arrival node drained to Target up to its arrivals, as in
+    FlowNetwork.from_airports. Every flight group runs from the departure
+    node of its departure bucket to the arrival node of its arrival bucket,
+    and uncapped ground arcs hold flow on either side of an airport until
+    its next active bucket. The graph grows with the number of active
+    airport-hours rather than with airports times buckets.
+
+    An attack on an airport lowers its capacity as in AviationNetwork, and
+    both gates of every one of its airport-hours in proportion.
+    '''
+    def __init__(self, airport_df, timed_route_df):
+        self.airport_df = airport_df.reset_index(drop=True)
+        airport_ids = pd.Series(np.arange(len(self.airport_df)), index=self.airport_df.iata)
+        origin = timed_route_df.origin.map(airport_ids)
+        dest = timed_route_df.dest.map(airport_ids)
+        known = (origin.notna() & dest.notna()).to_numpy()
+        origin = origin.to_numpy()[known].astype(np.int64)
+        dest = dest.to_numpy()[known].astype(np.int64)
+        dep_bucket = timed_route_df.dep_bucket.to_numpy(dtype=np.int64)[known]
+        arr_bucket = timed_route_df.arr_bucket.to_numpy(dtype=np.int64)[known]
+        num_of_flights = timed_route_df.num_of_flights.to_numpy(dtype=np.float64)[known]
+
+        # Number the active airport-hours by airport, then by bucket, so the
+        # hours of an airport are contiguous and in time order.
+        num_buckets = max(dep_bucket.max(initial=0), arr_bucket.max(initial=0)) + 1
+        keys = np.concatenate([origin * num_buckets + dep_bucket, dest * num_buckets + arr_bucket])
+        (active, position) = np.unique(keys, return_inverse=True)
+        (departure_hour, arrival_hour) = np.split(position.ravel(), 2)
+        num_hours = len(active)
+        self.hour_airport = active // num_buckets
+        self.hour_bucket = active % num_buckets
+        departures = np.bincount(departure_hour, num_of_flights, minlength=num_hours)
+        arrivals = np.bincount(arrival_hour, num_of_flights, minlength=num_hours)
+
+        node_dep = 2 + 2 * np.arange(num_hours)
+        node_arr = node_dep + 1
+        ground = np.flatnonzero(self.hour_airport[1:] == self.hour_airport[:-1])
+        tails = np.concatenate([np.full(num_hours, SOURCE), node_arr, node_dep[departure_hour],
+                                node_dep[ground], node_arr[ground]])
+        heads = np.concatenate([node_dep, np.full(num_hours, TARGET), node_arr[arrival_hour],
+                                node_dep[ground + 1], node_arr[ground + 1]])
+        capacities = np.concatenate([departures, arrivals, num_of_flights,
+                                     np.full(2 * len(ground), np.inf)])
+        self.network = FlowNetwork(2 + 2 * num_hours, tails, heads, capacities)
+        # The departure and arrival gate of every airport-hour.
+        self.hour_arcs = self.network.arc_ids[:2 * num_hours].reshape(2, num_hours).T.copy()
+        self.base_capacity = np.stack([departures, arrivals], axis=1)
+
+        self.hour_offsets = np.searchsorted(self.hour_airport, np.arange(len(self.airport_df) + 1))
+        self.init_capacity = np.bincount(self.hour_airport, self.base_capacity.sum(1),
+                                         minlength=len(self.airport_df))
+        self.security_level = self.airport_df.security_level.to_numpy(dtype=np.float64)
+
+    @classmethod
+    def from_bts(cls, airport_df, path, bucket_minutes=60, by_date=False, chunksize=1000000):
+        '''
+        Build a network from a BTS on-time report; see count_timed_routes.
+        '''
+        return cls(airport_df, count_timed_routes(path, bucket_minutes, by_date, chunksize))
+
+    def _hour_capacities(self, airport_capacity):
+        '''
+        Get the capacity of both gates of every airport-hour when the
+        airports have the given capacities, scaling each airport's hours in
+        proportion.
+        '''
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(self.init_capacity > 0, airport_capacity / self.init_capacity, 0.0)
+        return self.base_capacity * ratio[self.hour_airport][:, None]
+
+    def max_flow(self):
+        '''
+        Compute the maximum flow value of the unattacked network.
+        '''
+        return IncrementalMaxFlow(self.network.copy(), scaling=False).flow_value
+
+    def evaluate_scenarios(self, scenarios):
+        '''
+        Compute the maximum flow after each row of the given matrix of
+        numbers of attacks per airport of airport_df, as with
+        AviationNetwork.evaluate_scenarios.
+        '''
+        scenarios = np.minimum(np.asarray(scenarios, dtype=np.int64), 3)
+        capacities = attacked_capacities(self.init_capacity, self.security_level, scenarios)
+        max_flow = IncrementalMaxFlow(self.network.copy(), scaling=False)
+        flow_values = np.empty(len(scenarios))
+        for (i, airport_capacity) in enumerate(capacities):
+            hour_capacities = self._hour_capacities(airport_capacity)
+            lowered = hour_capacities < self.base_capacity
+            flow_values[i] = max_flow.evaluate_capacities(self.hour_arcs[lowered],
+                                                          hour_capacities[lowered])
+        return flow_values
+
+    def iter_min_max_flow(self, max_attacks=15, max_attack_per_airport=1, min_drop=None,
+                          callbacks=()):
+        '''
+        Attack the airport that lowers the maximum flow the most, until the
+        given maximum number of attacks, yielding a record per attack as
+        AviationNetwork.iter_min_max_flow does. Candidates are evaluated in
+        decreasing order of how much flow their hours carry above their new
+        capacities, until none left can beat the best one.
+
+        The generator returns a DataFrame of the airports with their
+        capacity, number of attacks, sequence of the last attack and the
+        flow value after it.
+        '''
+        network = self.network.copy()
+        max_flow = IncrementalMaxFlow(network, scaling=False)
+        capacity = self.init_capacity.copy()
+        number_of_attacks = np.zeros(len(capacity), dtype=np.int64)
+        sequence = np.zeros(len(capacity), dtype=np.int64)
+        flow_values = np.full(len(capacity), np.nan)
+        has_hours = np.diff(self.hour_offsets) > 0
+
+        for seq in range(1, max_attacks + 1):
+            timer = RoundTimer()
+            max_flow.reset_stats()
+            attackable = np.flatnonzero((number_of_attacks < max_attack_per_airport) & has_hours)
+            if not len(attackable):
+                break
+            new_capacity = capacity.copy()
+            new_capacity[attackable] = attack_impact(capacity[attackable], self.security_level[attackable],
+                                                     number_of_attacks[attackable] + 1)
+            hour_capacities = self._hour_capacities(new_capacity)
+            excess = np.maximum(0, network.flow[self.hour_arcs] - hour_capacities).sum(1)
+            bounds = np.bincount(self.hour_airport, excess, minlength=len(capacity))[attackable]
+            timer.lap('setup')
+
+            total_flow = max_flow.flow_value
+            tolerance = EPSILON * max(1.0, abs(total_flow))
+            (best, best_flow_value, num_evaluated) = (None, None, 0)
+            for airport in attackable[np.lexsort((attackable, -bounds))]:
+                lower = total_flow - bounds[np.searchsorted(attackable, airport)]
+                if best is not None and (lower > best_flow_value + tolerance or
+                                         (lower >= best_flow_value - tolerance and airport > best)):
+                    break
+                hours = slice(self.hour_offsets[airport], self.hour_offsets[airport + 1])
+                flow_value = max_flow.evaluate_capacities(self.hour_arcs[hours].ravel(),
+                                                          hour_capacities[hours].ravel())
+                num_evaluated += 1
+                if best is None or flow_value < best_flow_value or \
+                        (flow_value == best_flow_value and airport < best):
+                    (best, best_flow_value) = (airport, flow_value)
+            timer.lap('evaluate')
+
+            hours = slice(self.hour_offsets[best], self.hour_offsets[best + 1])
+            max_flow.set_capacities(self.hour_arcs[hours].ravel(), hour_capacities[hours].ravel())
+            capacity[best] = new_capacity[best]
+            number_of_attacks[best] += 1
+            sequence[best] = seq
+            flow_values[best] = max_flow.flow_value
+            timer.lap('commit')
+
+            record = {
+                'event': 'round',
+                'seq': seq,
+                'iata': self.airport_df.iata[best],
+                'new_capacity': float(new_capacity[best]),
+                'flow_value': float(max_flow.flow_value),
+                'flow_drop': float(total_flow - max_flow.flow_value),
+                'num_candidates': len(attackable),
+                'num_evaluated': num_evaluated,
+                'round_seconds': timer.total()
+            }
+            record.update(timer.seconds)
+            record.update(max_flow.stats)
+            emit(callbacks, record)
+            yield record
+            if min_drop is not None and record['flow_drop'] < min_drop:
+                break
+
+        sequence = pd.array(sequence, dtype='Int64')
+        sequence[number_of_attacks == 0] = pd.NA
+        return self.airport_df.set_index('iata').assign(
+            capacity=capacity,
+            number_of_attacks=number_of_attacks,
+            sequence=sequence,
+            flow_value=flow_values)